@@ -1,9 +1,31 @@
+import os
+import time
+_started = time.perf_counter()
+
 import streamlit as st
 import sqlite3
-import pandas as pd
 from datetime import datetime
-import plotly.express as px
-import plotly.graph_objects as go
+
+from neo_queries import queries, filter_query as build_filter_query, forecast_query
+import neo_backend
+import neo_changes
+import neo_export
+import neo_sketches
+import neo_snapshot
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_snapshot(db_signature):
+    # Parsed once per database state; any write changes the signature and reloads it
+    return neo_snapshot.load_snapshot()
+
+
+# Precomputed overview/query results written after each ingest (see neo_snapshot.py)
+try:
+    db_signature = tuple(neo_snapshot.db_signature("Asteroid_Data.db"))
+except OSError:
+    db_signature = None
+use_snapshot = db_signature is not None and os.environ.get("NEO_USE_SNAPSHOT", "1") != "0"
+snapshot = load_snapshot(db_signature) if use_snapshot else None
 
 # Streamlit UI setup with enhanced styling
 st.set_page_config(
@@ -75,15 +97,56 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(max_entries=4, show_spinner="Preparing query engine...")
+def open_backend(engine, db_signature):
+    # Shared by every session and rerun; a changed database (new signature) gets a fresh
+    # backend, which rebuilds its copy of the data if needed
+    return neo_backend.connect(engine)
+
 # Connect to the database
+sketches = None
 try:
     conn = sqlite3.connect("Asteroid_Data.db")
     cursor = conn.cursor()
+    # The catalog and filters fall back to this connection if another engine cannot open
+    db = neo_backend.SQLiteBackend(conn=conn)
     
+    # Approximate mode answers the overview from sketches maintained at ingest (see neo_sketches.py)
+    approximate_mode = st.sidebar.toggle("⚡ Approximate mode", help="Instant overview metrics from ingest-time sketches, with error bounds")
+    sketches = neo_sketches.SketchSet.load(conn) if approximate_mode else None
+    if approximate_mode and sketches is None:
+        st.sidebar.warning("No sketches stored yet. Run `python neo_sketches.py --rebuild`. Showing exact values.")
+
+    # Engine that runs the query catalog and the filters (see neo_backend.py)
+    engines = neo_backend.available_backends()
+    default_engine = neo_backend.default_backend()
+    engine = st.sidebar.selectbox("🗄️ Query engine", engines,
+                                  index=engines.index(default_engine) if default_engine in engines else 0,
+                                  help="duckdb runs the same queries on a columnar copy of the database, "
+                                       "compact on a smaller SQLite encoding of it")
+    if engine != "sqlite":
+        try:
+            db = open_backend(engine, db_signature)
+        except Exception as e:
+            st.sidebar.warning(f"⚠️ The {engine} engine could not be opened ({e}); using sqlite.")
+
     # Get database stats for overview
-    total_asteroids = pd.read_sql_query("SELECT COUNT(DISTINCT id) as count FROM asteroids", conn).iloc[0]['count']
-    total_approaches = pd.read_sql_query("SELECT COUNT(*) as count FROM close_approach", conn).iloc[0]['count']
-    hazardous_count = pd.read_sql_query("SELECT COUNT(*) as count FROM asteroids WHERE is_potentially_hazardous_asteroid = 1", conn).iloc[0]['count']
+    if sketches is not None:
+        overview = sketches.overview()
+        total_asteroids = round(overview["total_asteroids"][0])
+        total_approaches = overview["total_approaches"][0]
+        hazardous_count = overview["hazardous_count"][0]
+        approx = "≈"
+        approx_note = f" (±{overview['total_asteroids'][1]:.1%})"
+    else:
+        if snapshot is not None:
+            stats = snapshot["overview"]
+        else:
+            stats = {name: cursor.execute(sql).fetchone()[0] for name, sql in neo_snapshot.OVERVIEW_QUERIES.items()}
+        total_asteroids = stats["total_asteroids"]
+        total_approaches = stats["total_approaches"]
+        hazardous_count = stats["hazardous_count"]
+        approx = approx_note = ""
     
     # Display key metrics at the top
     col1, col2, col3, col4 = st.columns(4)
@@ -91,8 +154,8 @@ try:
     with col1:
         st.markdown(f"""
         <div class="metric-container">
-            <h2>🌑 {total_asteroids:,}</h2>
-            <p>Total Asteroids Tracked</p>
+            <h2>🌑 {approx}{total_asteroids:,}</h2>
+            <p>Total Asteroids Tracked{approx_note}</p>
         </div>
         """, unsafe_allow_html=True)
     
@@ -116,43 +179,83 @@ try:
         hazard_percentage = (hazardous_count / total_asteroids * 100) if total_asteroids > 0 else 0
         st.markdown(f"""
         <div class="metric-container">
-            <h2>📊 {hazard_percentage:.1f}%</h2>
-            <p>Hazard Rate</p>
+            <h2>📊 {approx}{hazard_percentage:.1f}%</h2>
+            <p>Hazard Rate{approx_note}</p>
         </div>
         """, unsafe_allow_html=True)
-    
+
 except Exception as e:
     st.error(f"⚠️ Database connection failed: {e}")
     st.info("🔧 Please ensure 'Asteroid_Data.db' is in the same directory as this script.")
 
+st.session_state["first_render_ms"] = (time.perf_counter() - _started) * 1000
+st.sidebar.caption(f"⏱️ Overview rendered in {st.session_state['first_render_ms']:.0f} ms"
+                   + (" (from snapshot)" if snapshot is not None and sketches is None else ""))
+
+# Heavier imports are deferred until the overview is already on the page
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+if sketches is not None:
+    with st.expander("⚡ Approximate velocity & distance percentiles"):
+        percentiles = pd.DataFrame(sketches.percentiles()).T
+        percentiles["rank_error"] = percentiles["rank_error"].map(lambda e: f"±{e:.1%} rank")
+        st.dataframe(percentiles, use_container_width=True)
+        st.caption(f"Average velocity {overview['avg_velocity'][0]:,.0f} km/h and maximum "
+                   f"{overview['max_velocity'][0]:,.0f} km/h are exact running totals.")
+        sample = pd.DataFrame({"relative_velocity_kmph": sketches.velocity_sample.items})
+        fig = px.histogram(sample, x="relative_velocity_kmph",
+                           title=f"Velocity distribution (reservoir sample of {len(sample):,} / {sketches.velocity_sample.n:,})")
+        fig.update_layout(height=400)
+        st.plotly_chart(fig, use_container_width=True)
+
 # Helper function to run and display SQL queries with enhanced visualization
-def show_query(query, show_chart=True):
+def show_query(query, show_chart=True, params=(), backend=None):
     try:
-        df = pd.read_sql_query(query, conn)
-        
-        # Display dataframe with enhanced styling
-        st.dataframe(df, use_container_width=True, height=400)
-        
-        # Add simple visualizations for certain queries
-        if show_chart and len(df) > 0:
-            # Determine chart type based on data
-            if len(df.columns) == 2 and df.columns[1] in ['count', 'approach_count', 'total']:
-                fig = px.bar(df.head(10), x=df.columns[0], y=df.columns[1], 
-                           title=f"Top 10 - {df.columns[1].replace('_', ' ').title()}")
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
-            
-            elif 'velocity' in df.columns[1].lower() if len(df.columns) > 1 else False:
-                fig = px.histogram(df.head(20), x=df.columns[1], 
-                                 title=f"Distribution of {df.columns[1].replace('_', ' ').title()}")
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
-        
-        return df
+        if backend is not None:
+            df = backend.query(query, params)
+        else:
+            df = pd.read_sql_query(query, conn, params=params)
+        return show_result(df, show_chart)
     except Exception as e:
         st.error(f"❌ Query execution failed: {e}")
         return pd.DataFrame()
 
+# Render a result table (and chart) from a DataFrame, e.g. one loaded from the snapshot
+def show_result(df, show_chart=True, chart=None):
+    # Display dataframe with enhanced styling
+    st.dataframe(df, use_container_width=True, height=400)
+    
+    # Add simple visualizations for certain queries
+    if show_chart and len(df) > 0:
+        # Snapshot results carry their bar chart data precomputed
+        if chart is not None:
+            fig = px.bar(x=chart["x"], y=chart["y"], title=chart["title"],
+                         labels={"x": chart["x_label"], "y": chart["y_label"]})
+            fig.update_layout(height=400)
+            st.plotly_chart(fig, use_container_width=True)
+
+        # Determine chart type based on data
+        elif len(df.columns) == 2 and df.columns[1] in ['count', 'approach_count', 'total']:
+            fig = px.bar(df.head(10), x=df.columns[0], y=df.columns[1], 
+                       title=f"Top 10 - {df.columns[1].replace('_', ' ').title()}")
+            fig.update_layout(height=400)
+            st.plotly_chart(fig, use_container_width=True)
+        
+        elif 'velocity' in df.columns[1].lower() if len(df.columns) > 1 else False:
+            fig = px.histogram(df.head(20), x=df.columns[1], 
+                             title=f"Distribution of {df.columns[1].replace('_', ' ').title()}")
+            fig.update_layout(height=400)
+            st.plotly_chart(fig, use_container_width=True)
+    
+    return df
+
+# Download buttons that stream the query result straight from the database cursor
+def export_buttons(query, file_stem, key):
+    fmt = st.selectbox("⬇️ Export format", list(neo_export.FORMATS), key=f"fmt_{key}")
+    neo_export.download_button(st, f"Download {fmt.upper()}", query, fmt, file_stem, key=f"dl_{key}")
+
 # Enhanced sidebar with better organization
 st.sidebar.markdown("## 🎯 Query Selection")
 st.sidebar.markdown("Choose from our comprehensive set of asteroid analysis queries:")
@@ -204,138 +307,6 @@ for category, queries_list in query_categories.items():
 if selected_query is None:
     selected_query = "1. Count asteroid approaches"
 
-# All Queries defined here (same as original)
-queries = {
-    "1. Count asteroid approaches": '''
-        SELECT neo_reference_id, COUNT(*) AS approach_count
-        FROM close_approach
-        GROUP BY neo_reference_id
-        ORDER BY approach_count DESC
-    ''',
-    "2. Average velocity per asteroid": '''
-        SELECT neo_reference_id, AVG(relative_velocity_kmph) AS avg_velocity
-        FROM close_approach
-        GROUP BY neo_reference_id
-        ORDER BY avg_velocity DESC
-    ''',
-    "3. Top 10 fastest asteroids": '''
-        SELECT neo_reference_id, MAX(relative_velocity_kmph) AS max_velocity
-        FROM close_approach
-        GROUP BY neo_reference_id
-        ORDER BY max_velocity DESC
-        LIMIT 10
-    ''',
-    "4. Hazardous asteroids > 3 approaches": '''
-        SELECT ca.neo_reference_id, COUNT(*) AS approach_count
-        FROM close_approach ca
-        JOIN asteroids a ON ca.neo_reference_id = a.id
-        WHERE a.is_potentially_hazardous_asteroid = 1
-        GROUP BY ca.neo_reference_id
-        HAVING COUNT(*) > 3
-    ''',
-    "5. Month with most approaches": '''
-        SELECT strftime('%Y-%m', close_approach_date) AS month, COUNT(*) AS count
-        FROM close_approach
-        GROUP BY month
-        ORDER BY count DESC
-        LIMIT 1
-    ''',
-    "6. Fastest ever approach": '''
-        SELECT neo_reference_id, MAX(relative_velocity_kmph) AS fastest_speed
-        FROM close_approach
-        ORDER BY fastest_speed DESC
-        LIMIT 1
-    ''',
-    "7. Sort by max estimated diameter": '''
-        SELECT id, name, estimated_diameter_max_km
-        FROM asteroids
-        ORDER BY estimated_diameter_max_km DESC
-    ''',
-    "8. Closest approach getting nearer over time": '''
-        SELECT *
-        FROM close_approach
-        ORDER BY neo_reference_id, close_approach_date
-    ''',
-    "9. Closest approach date & distance": '''
-        SELECT a.name, ca.close_approach_date, MIN(ca.miss_distance_km) AS closest_approach
-        FROM close_approach ca
-        JOIN asteroids a ON ca.neo_reference_id = a.id
-        GROUP BY a.id
-        ORDER BY closest_approach ASC
-    ''',
-    "10. Velocity > 50,000 km/h": '''
-        SELECT DISTINCT a.name, ca.relative_velocity_kmph
-        FROM close_approach ca
-        JOIN asteroids a ON ca.neo_reference_id = a.id
-        WHERE ca.relative_velocity_kmph > 50000
-    ''',
-    "11. Approaches per month": '''
-        SELECT strftime('%Y-%m', close_approach_date) AS month, COUNT(*) AS total
-        FROM close_approach
-        GROUP BY month
-        ORDER BY total DESC
-    ''',
-    "12. Brightest asteroid (lowest magnitude)": '''
-        SELECT id, name, absolute_magnitude_h
-        FROM asteroids
-        ORDER BY absolute_magnitude_h ASC
-        LIMIT 1
-    ''',
-    "13. Hazardous vs Non-hazardous count": '''
-        SELECT is_potentially_hazardous_asteroid, COUNT(*) AS count
-        FROM asteroids
-        GROUP BY is_potentially_hazardous_asteroid
-    ''',
-    "14. Asteroids < 1 LD": '''
-        SELECT a.name, ca.close_approach_date, ca.miss_distance_lunar
-        FROM close_approach ca
-        JOIN asteroids a ON ca.neo_reference_id = a.id
-        WHERE ca.miss_distance_lunar < 1
-        ORDER BY ca.miss_distance_lunar
-    ''',
-    "15. Asteroids < 0.05 AU": '''
-        SELECT a.name, ca.close_approach_date, ca.astronomical
-        FROM close_approach ca
-        JOIN asteroids a ON ca.neo_reference_id = a.id
-        WHERE ca.astronomical < 0.05
-        ORDER BY ca.astronomical
-    ''',
-    "Bonus 1: Orbiting bodies (non-Earth)": '''
-        SELECT orbiting_body, COUNT(*) AS count
-        FROM close_approach
-        WHERE orbiting_body != 'Earth'
-        GROUP BY orbiting_body
-        ORDER BY count DESC
-    ''',
-    "Bonus 2: Avg miss distance by hazard type": '''
-        SELECT a.is_potentially_hazardous_asteroid, AVG(ca.miss_distance_km) AS avg_miss_distance
-        FROM close_approach ca
-        JOIN asteroids a ON ca.neo_reference_id = a.id
-        GROUP BY a.is_potentially_hazardous_asteroid
-    ''',
-    "Bonus 3: Top 5 closest approaches": '''
-        SELECT a.name, ca.close_approach_date, ca.miss_distance_km
-        FROM close_approach ca
-        JOIN asteroids a ON ca.neo_reference_id = a.id
-        ORDER BY ca.miss_distance_km ASC
-        LIMIT 5
-    ''',
-    "Bonus 4: Count of hazardous asteroids": '''
-        SELECT COUNT(DISTINCT id) AS hazardous_asteroid_count
-        FROM asteroids
-        WHERE is_potentially_hazardous_asteroid = 1
-    ''',
-    "Bonus 5: Frequent <1 LD asteroids": '''
-        SELECT ca.neo_reference_id, a.name, COUNT(*) AS close_pass_count
-        FROM close_approach ca
-        JOIN asteroids a ON ca.neo_reference_id = a.id
-        WHERE ca.miss_distance_lunar < 1
-        GROUP BY ca.neo_reference_id
-        HAVING COUNT(*) > 1
-        ORDER BY close_pass_count DESC
-    '''
-}
-
 # Display selected query results
 st.markdown(f"""
 <div class="query-section">
@@ -343,8 +314,13 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-if 'conn' in locals():
-    show_query(queries[selected_query])
+if snapshot is not None and selected_query in snapshot["queries"]:
+    result = snapshot["queries"][selected_query]
+    show_result(pd.DataFrame(result["rows"], columns=result["columns"]), chart=result["chart"])
+    export_buttons(queries[selected_query], "neo_query_result", "query")
+elif 'conn' in locals():
+    show_query(db.catalog_query(selected_query), backend=db)
+    export_buttons(queries[selected_query], "neo_query_result", "query")
 
 # Enhanced Filters Section
 st.markdown("""
@@ -383,25 +359,13 @@ with col2:
     hazardous = st.selectbox("Potentially Hazardous?", ["Both", "Yes", "No"])
 
 # Filter query (same as original)
-filter_query = f'''
-SELECT a.name, ca.close_approach_date, ca.relative_velocity_kmph, ca.miss_distance_km, ca.miss_distance_lunar,
-       a.estimated_diameter_min_km, a.estimated_diameter_max_km, a.is_potentially_hazardous_asteroid
-FROM close_approach ca
-JOIN asteroids a ON ca.neo_reference_id = a.id
-WHERE date(ca.close_approach_date) >= date('{selected_date}')
-  AND ca.miss_distance_km BETWEEN {min_au} AND {max_au}  
-  AND ca.miss_distance_lunar BETWEEN {min_ld} AND {max_ld}
-  AND ca.relative_velocity_kmph BETWEEN {min_velocity} AND {max_velocity}
-  AND a.estimated_diameter_max_km BETWEEN {min_diameter} AND {max_diameter}
-'''
-if hazardous == "Yes":
-    filter_query += " AND a.is_potentially_hazardous_asteroid = 1"
-elif hazardous == "No":
-    filter_query += " AND a.is_potentially_hazardous_asteroid = 0"
+filter_query = build_filter_query(selected_date, min_au, max_au, min_ld, max_ld,
+                                  min_velocity, max_velocity, min_diameter, max_diameter, hazardous)
 
 st.markdown("### 🎯 Filtered Results")
 if 'conn' in locals():
-    filtered_df = show_query(filter_query, show_chart=False)
+    filtered_df = show_query(filter_query, show_chart=False, backend=db)
+    export_buttons(filter_query, "neo_filtered_results", "filter")
     
     # Add summary of filtered results
     if not filtered_df.empty:
@@ -421,6 +385,48 @@ if 'conn' in locals():
     else:
         st.warning("🔍 No asteroids found matching your criteria. Try adjusting the filters.")
 
+# Forecast of future approaches from locally propagated orbits (see neo_orbits.py)
+has_forecast = 'conn' in locals() and cursor.execute(
+    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'forecast_approach'").fetchone()
+if has_forecast:
+    st.markdown("""
+<div class="filter-section">
+    <h2>🔭 Forecast Close Approaches</h2>
+    <p>Known objects predicted to pass near Earth, from two-body orbit propagation of their catalogued elements</p>
+</div>
+""", unsafe_allow_html=True)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        forecast_ld = st.slider("Within (LD)", 0.5, 50.0, 5.0, 0.5)
+    with col2:
+        forecast_until = st.date_input("Until", datetime(datetime.now().year + 10, 12, 31))
+    with col3:
+        forecast_hazardous = st.checkbox("☄️ Only hazardous", key="forecast_hazardous")
+    show_query(forecast_query(forecast_ld, forecast_until, forecast_hazardous), show_chart=False)
+
+# What the latest re-ingest changed, read from the change log (see neo_changes.py)
+last_sync = neo_changes.last_sync(conn) if 'conn' in locals() else None
+if last_sync:
+    st.markdown(f"""
+<div class="filter-section">
+    <h2>🔄 Since Last Sync</h2>
+    <p>Sync #{last_sync['sync_id']} finished {last_sync['finished_at'][:19].replace('T', ' ')} UTC
+    (feed window starting {last_sync['start_date']})</p>
+</div>
+""", unsafe_allow_html=True)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("➕ Inserted", f"{last_sync['inserted']:,}")
+    with col2:
+        st.metric("✏️ Updated", f"{last_sync['updated']:,}")
+    with col3:
+        st.metric("🗑️ Deleted", f"{last_sync['deleted']:,}")
+    with col4:
+        st.metric("✅ Unchanged", f"{last_sync['unchanged']:,}")
+    for name, query in neo_changes.change_queries.items():
+        with st.expander(name):
+            show_query(query, show_chart=False, params=(last_sync['sync_id'],))
+
 # Enhanced launch instructions
 st.markdown("""
 ---
@@ -0,0 +1,382 @@
+import os
+import time
+import sqlite3
+import tempfile
+import importlib.util
+import threading
+import statistics
+from contextlib import contextmanager
+
+import neo_export
+from neo_queries import queries
+from neo_snapshot import db_signature
+
+DB_PATH = "Asteroid_Data.db"
+
+# Tables the query catalog and the filter engine read; these are mirrored into DuckDB
+MIRRORED_TABLES = ("asteroids", "close_approach")
+
+# Dates become DATE in the mirror so grouping by month is a columnar operation
+DATE_COLUMNS = {"close_approach_date"}
+
+# Catalog queries that rely on SQLite's bare-column rule (a non-aggregated column next to
+# MIN/MAX takes its value from the min/max row); DuckDB spells that with arg_min/arg_max.
+DUCKDB_QUERIES = {
+    "6. Fastest ever approach": '''
+        SELECT arg_max(neo_reference_id, relative_velocity_kmph) AS neo_reference_id,
+               MAX(relative_velocity_kmph) AS fastest_speed
+        FROM close_approach
+        ORDER BY fastest_speed DESC
+        LIMIT 1
+    ''',
+    "9. Closest approach date & distance": '''
+        SELECT any_value(a.name) AS name, arg_min(ca.close_approach_date, ca.miss_distance_km) AS close_approach_date,
+               MIN(ca.miss_distance_km) AS closest_approach
+        FROM close_approach ca
+        JOIN asteroids a ON ca.neo_reference_id = a.id
+        GROUP BY a.id
+        ORDER BY closest_approach ASC
+    ''',
+    "Bonus 5: Frequent <1 LD asteroids": '''
+        SELECT ca.neo_reference_id, any_value(a.name) AS name, COUNT(*) AS close_pass_count
+        FROM close_approach ca
+        JOIN asteroids a ON ca.neo_reference_id = a.id
+        WHERE ca.miss_distance_lunar < 1
+        GROUP BY ca.neo_reference_id
+        HAVING COUNT(*) > 1
+        ORDER BY close_pass_count DESC
+    ''',
+}
+
+# SQLite functions used by the filter engine, defined as DuckDB macros
+DUCKDB_MACROS = [
+    "CREATE OR REPLACE TEMP MACRO date(x) AS CAST(x AS DATE)",
+]
+
+
+def _duckdb_type(declared):
+    # SQLite's column affinity rules; BOOLEAN stays an integer because SQLite stores 0/1
+    declared = (declared or "").upper()
+    if "INT" in declared or "BOOL" in declared:
+        return "BIGINT"
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB")):
+        return "DOUBLE"
+    return "VARCHAR"
+
+
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+
+@contextmanager
+def build_lock(out_path):
+    """Hold while checking and rebuilding ``out_path``, so concurrent opens build it once.
+
+    A thread lock per path, plus ``flock`` on ``<out_path>.lock`` where
+    available, so other processes (e.g. a second dashboard) wait too.
+    """
+    with _build_locks_guard:
+        lock = _build_locks.setdefault(os.path.abspath(out_path), threading.Lock())
+    with lock:
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+        with open(out_path + ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def temp_path_for(out_path):
+    """Unused path next to ``out_path`` to build into before an atomic ``os.replace``."""
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(out_path) + ".", suffix=".tmp",
+                               dir=os.path.dirname(os.path.abspath(out_path)))
+    os.close(fd)
+    # The engines create the file themselves (DuckDB refuses an empty one)
+    os.remove(tmp)
+    return tmp
+
+
+def duckdb_path_for(db_path):
+    """DuckDB mirror kept next to the SQLite database it was built from."""
+    return os.path.splitext(db_path)[0] + ".duckdb"
+
+
+def build_duckdb_mirror(db_path=DB_PATH, out_path=None, chunk_size=neo_export.CHUNK_SIZE):
+    """Copy the mirrored tables from SQLite into a DuckDB file, streaming Arrow batches."""
+    import duckdb
+    import pyarrow as pa
+
+    arrow_types = {"BIGINT": pa.int64(), "DOUBLE": pa.float64(), "VARCHAR": pa.string()}
+    out_path = out_path or duckdb_path_for(db_path)
+    tmp = temp_path_for(out_path)
+    started = time.perf_counter()
+    source = sqlite3.connect(db_path)
+    duck = duckdb.connect(tmp)
+    try:
+        for table in MIRRORED_TABLES:
+            declared = [(row[1], _duckdb_type(row[2])) for row in source.execute(f"PRAGMA table_info({table})")]
+            schema = pa.schema([(name, arrow_types[t]) for name, t in declared])
+            columns = ", ".join(f"{name} {'DATE' if name in DATE_COLUMNS else t}" for name, t in declared)
+            duck.execute(f"CREATE TABLE {table} ({columns})")
+            for _, rows in neo_export.stream_rows(source, f"SELECT * FROM {table}", chunk_size=chunk_size):
+                batch = pa.Table.from_pylist([dict(zip(schema.names, row)) for row in rows], schema=schema)
+                duck.register("batch", batch)
+                duck.execute(f"INSERT INTO {table} SELECT * FROM batch")
+                duck.unregister("batch")
+        duck.execute("CREATE TABLE mirror_source (db_path VARCHAR, size BIGINT, mtime_ns BIGINT)")
+        size, mtime_ns = db_signature(db_path)
+        duck.execute("INSERT INTO mirror_source VALUES (?, ?, ?)", [os.path.abspath(db_path), size, mtime_ns])
+    except BaseException:
+        duck.close()
+        source.close()
+        os.remove(tmp)
+        raise
+    duck.close()
+    source.close()
+    os.replace(tmp, out_path)
+    print(f"Wrote {out_path} ({os.path.getsize(out_path):,} bytes) in {time.perf_counter() - started:.2f}s")
+    return out_path
+
+
+def _mirror_is_current(db_path, duck_path):
+    import duckdb
+
+    if not os.path.exists(duck_path):
+        return False
+    try:
+        with duckdb.connect(duck_path, read_only=True) as duck:
+            row = duck.execute("SELECT size, mtime_ns FROM mirror_source").fetchone()
+    except duckdb.Error:
+        return False
+    return row is not None and list(row) == db_signature(db_path)
+
+
+class SQLiteBackend:
+    """The dashboards' original engine: ``pd.read_sql_query`` on the SQLite file."""
+
+    name = "sqlite"
+
+    def __init__(self, db_path=DB_PATH, conn=None):
+        # An already open connection (e.g. the dashboard's) can be reused
+        self.conn = conn if conn is not None else sqlite3.connect(db_path, check_same_thread=False)
+        # One query at a time, so a backend can be shared by every dashboard session
+        self._lock = threading.Lock()
+
+    def catalog_query(self, name):
+        return queries[name]
+
+    def query(self, sql, params=()):
+        import pandas as pd
+
+        with self._lock:
+            return pd.read_sql_query(sql, self.conn, params=params)
+
+    def close(self):
+        self.conn.close()
+
+
+class DuckDBBackend:
+    """Embedded DuckDB over a columnar mirror of the SQLite tables.
+
+    The mirror (``Asteroid_Data.duckdb``) is rebuilt whenever the SQLite
+    file's size/mtime no longer match the ones it was built from. Results
+    come back as Arrow and are wrapped into Arrow-backed pandas columns
+    without copying.
+    """
+
+    name = "duckdb"
+
+    def __init__(self, db_path=DB_PATH, duckdb_path=None):
+        import duckdb
+
+        duckdb_path = duckdb_path or duckdb_path_for(db_path)
+        with build_lock(duckdb_path):
+            if not _mirror_is_current(db_path, duckdb_path):
+                build_duckdb_mirror(db_path, duckdb_path)
+            self.conn = duckdb.connect(duckdb_path, read_only=True)
+        for macro in DUCKDB_MACROS:
+            self.conn.execute(macro)
+        self._lock = threading.Lock()
+
+    def catalog_query(self, name):
+        return DUCKDB_QUERIES.get(name, queries[name])
+
+    def query(self, sql, params=()):
+        import pandas as pd
+
+        with self._lock:
+            table = self.conn.execute(sql, list(params)).to_arrow_table()
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    def close(self):
+        self.conn.close()
+
+
+class CompactBackend(SQLiteBackend):
+    """SQLite over the compact encoding of the database (see neo_compact.py).
+
+    Queries run unchanged against its ``asteroids``/``close_approach``
+    compatibility views. A database converted to the compact layout is read
+    directly; otherwise a read-only copy (``Asteroid_Data.compact.db``) is
+    built and rebuilt whenever the SQLite file's size/mtime change.
+    """
+
+    name = "compact"
+
+    def __init__(self, db_path=DB_PATH, compact_path=None):
+        import neo_compact
+
+        if neo_compact.is_compact(db_path):
+            super().__init__(conn=sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False))
+            return
+        compact_path = compact_path or neo_compact.compact_path_for(db_path)
+        with build_lock(compact_path):
+            if not neo_compact.is_current(db_path, compact_path):
+                neo_compact.build_compact(db_path, compact_path)
+            conn = sqlite3.connect(f"file:{compact_path}?mode=ro", uri=True, check_same_thread=False)
+        super().__init__(conn=conn)
+
+
+BACKENDS = {"sqlite": SQLiteBackend, "duckdb": DuckDBBackend, "compact": CompactBackend}
+
+
+def available_backends():
+    """Backend names whose engine is importable here."""
+    names = ["sqlite"]
+    # Generated columns, which the compact encoding derives AU/LD with, need SQLite 3.31
+    if sqlite3.sqlite_version_info >= (3, 31, 0):
+        names.append("compact")
+    # find_spec rather than import: the dashboard lists engines before its first paint,
+    # and importing duckdb + pyarrow there would cost ~200 ms on every cold start
+    if all(importlib.util.find_spec(module) is not None for module in ("duckdb", "pyarrow")):
+        names.append("duckdb")
+    return names
+
+
+def default_backend():
+    return os.environ.get("NEO_BACKEND", "sqlite")
+
+
+def connect(name=None, db_path=DB_PATH, **kwargs):
+    """Open the backend ``name`` (default: $NEO_BACKEND, else sqlite)."""
+    name = name or default_backend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](db_path, **kwargs)
+
+
+def scaled_copy(db_path, out_path, scale):
+    """Write ``out_path`` with the mirrored tables repeated ``scale`` times under shifted ids."""
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    conn = sqlite3.connect(out_path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS src", (db_path,))
+        for table in MIRRORED_TABLES:
+            # Same DDL as the source, so declared types (and so the mirror's types) match
+            kind, sql = conn.execute("SELECT type, sql FROM src.sqlite_master WHERE name = ?", (table,)).fetchone()
+            if kind == "view":
+                # A compact-layout source (see neo_compact.convert); its decoded date and body are text
+                sql = f"CREATE TABLE {table} (" + ", ".join(
+                    f"{name} {declared or 'TEXT'}" for _, name, declared, *_ in
+                    conn.execute(f"PRAGMA src.table_info({table})")) + ")"
+            conn.execute(sql)
+        offset = conn.execute("SELECT MAX(id) + 1 FROM src.asteroids").fetchone()[0] or 1
+        with conn:
+            for k in range(scale):
+                for table, key in (("asteroids", "id"), ("close_approach", "neo_reference_id")):
+                    conn.execute(f"INSERT INTO {table} SELECT {_shifted_columns(conn, table, key, k, offset)} "
+                                 f"FROM src.{table}")
+        conn.execute("DETACH DATABASE src")
+    finally:
+        conn.close()
+    return out_path
+
+
+def _shifted_columns(conn, table, key, copy, offset):
+    # Copy ``copy`` gets ids shifted by ``offset`` and its REAL measurements scaled by
+    # 1 + copy * 1e-9, so copies never tie exactly (ties make LIMIT results engine-dependent)
+    shifted = []
+    for _, column, declared, *_ in conn.execute(f"PRAGMA src.table_info({table})"):
+        if column == key:
+            shifted.append(f"{column} + {copy * offset}")
+        elif declared.upper() == "REAL" and copy:
+            shifted.append(f"{column} * {1 + copy * 1e-9!r}")
+        else:
+            shifted.append(column)
+    return ", ".join(shifted)
+
+
+def _normalized(df):
+    # Compare results as sorted, rounded value rows; engines differ in dtypes and tie order
+    rows = []
+    for row in df.astype(object).itertuples(index=False):
+        # 9 significant digits: AVG over ~1e7 km values differs in the last bits by summation order
+        rows.append(tuple("" if v is None or v != v else float(f"{v:.9g}") if isinstance(v, (int, float))
+                          else str(v) for v in row))
+    return sorted(rows)
+
+
+def benchmark(db_path=DB_PATH, scales=(1, 10, 50), repeat=3, workdir=None):
+    """Time every catalog query on SQLite and DuckDB for ``db_path`` scaled by each factor.
+
+    Each timing is the median of ``repeat`` runs and includes materializing
+    the pandas DataFrame. Results are also compared across engines.
+    """
+    import tempfile
+
+    workdir = workdir or tempfile.mkdtemp(prefix="neo_backend_")
+    results = []
+    for scale in scales:
+        path = os.path.join(workdir, f"scale_{scale}.db")
+        scaled_copy(db_path, path, scale)
+        rows = sqlite3.connect(path).execute("SELECT COUNT(*) FROM close_approach").fetchone()[0]
+        backends = [SQLiteBackend(path), DuckDBBackend(path)]
+        print(f"\nScale x{scale}: {rows:,} approaches")
+        print(f"{'query':<46}{'sqlite ms':>11}{'duckdb ms':>11}{'speedup':>9}  same")
+        totals = {b.name: 0.0 for b in backends}
+        for name in queries:
+            timings, frames = {}, {}
+            for backend in backends:
+                sql = backend.catalog_query(name)
+                samples = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    frames[backend.name] = backend.query(sql)
+                    samples.append((time.perf_counter() - started) * 1000)
+                timings[backend.name] = statistics.median(samples)
+                totals[backend.name] += timings[backend.name]
+            same = _normalized(frames["sqlite"]) == _normalized(frames["duckdb"])
+            speedup = timings["sqlite"] / timings["duckdb"] if timings["duckdb"] else float("inf")
+            print(f"{name[:45]:<46}{timings['sqlite']:>11.1f}{timings['duckdb']:>11.1f}{speedup:>8.1f}x  "
+                  f"{'yes' if same else 'NO'}")
+            results.append({"scale": scale, "rows": rows, "query": name, "same": same, **timings})
+        print(f"{'total':<46}{totals['sqlite']:>11.1f}{totals['duckdb']:>11.1f}"
+              f"{totals['sqlite'] / totals['duckdb']:>8.1f}x")
+        for backend in backends:
+            backend.close()
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query backends for the NEO catalog: mirror and benchmark")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--build", action="store_true", help="(re)build the DuckDB mirror of --db")
+    parser.add_argument("--benchmark", action="store_true", help="time all catalog queries on both engines")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.build:
+        build_duckdb_mirror(args.db)
+    if args.benchmark:
+        benchmark(args.db, args.scales, args.repeat)
+    if not (args.build or args.benchmark):
+        parser.print_help()
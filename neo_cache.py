@@ -0,0 +1,219 @@
+import os
+import gzip
+import json
+import time
+import sqlite3
+import hashlib
+import itertools
+from datetime import datetime, timezone
+from collections import deque
+from urllib.parse import urlsplit, parse_qsl
+from concurrent.futures import ProcessPoolExecutor
+
+import requests
+
+import neo_ingest
+import neo_sketches
+import neo_snapshot
+import neo_validate
+
+CACHE_DIR = "neo_cache"
+
+# Query parameters that never change the response body and must not leak into keys
+IGNORED_PARAMS = {"api_key"}
+
+
+def cache_key(url):
+    """Content address for a request: sha256 over endpoint path + sorted params (api_key excluded)."""
+    parts = urlsplit(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query) if k not in IGNORED_PARAMS)
+    canonical = json.dumps([parts.path, params], separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest(), dict(params)
+
+
+class ResponseCache:
+    """On-disk store of raw NeoWs responses.
+
+    Each response body is gzip-compressed under ``<root>/<key[:2]>/<key>.json.gz``
+    with a ``.meta.json`` sidecar holding the request params and the
+    ``ETag``/``Last-Modified`` validators used for conditional revalidation.
+    """
+
+    def __init__(self, root=CACHE_DIR, offline=False, revalidate=False):
+        self.root = root
+        self.offline = offline
+        self.revalidate = revalidate
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def _paths(self, key):
+        folder = os.path.join(self.root, key[:2])
+        return os.path.join(folder, key + ".json.gz"), os.path.join(folder, key + ".meta.json")
+
+    def load(self, key):
+        body_path, meta_path = self._paths(key)
+        if not os.path.exists(body_path):
+            return None, None
+        with gzip.open(body_path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        return data, meta
+
+    def store(self, key, params, data, headers=None):
+        body_path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        headers = headers or {}
+        meta = {
+            "params": params,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+        }
+        # Write to temp files then rename so a crash never leaves a half-written entry
+        tmp = body_path + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, body_path)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def get(self, url, session=None):
+        """Return the JSON body for ``url``, from disk when possible."""
+        key, params = cache_key(url)
+        data, meta = self.load(key)
+        if data is not None and (self.offline or not self.revalidate):
+            self.hits += 1
+            return data
+        if self.offline:
+            raise LookupError(f"Not cached (offline mode): {params}")
+
+        headers = {}
+        if data is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        session = session or requests.Session()
+        response = session.get(url, headers=headers, timeout=30)
+        if response.status_code == 304 and data is not None:
+            self.revalidated += 1
+            return data
+        response.raise_for_status()
+        self.misses += 1
+        data = response.json()
+        self.store(key, params, data, response.headers)
+        return data
+
+    def entries(self):
+        """List (key, params) for every cached response."""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for folder in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, folder)
+            if not os.path.isdir(path):
+                continue
+            for name in os.listdir(path):
+                if name.endswith(".meta.json"):
+                    with open(os.path.join(path, name), encoding="utf-8") as f:
+                        found.append((name[:-len(".meta.json")], json.load(f)["params"]))
+        return found
+
+
+def _parse_cached(args):
+    # Runs in a worker process: decompress + parse one cached page into record tuples
+    root, key = args
+    data, _ = ResponseCache(root, offline=True).load(key)
+    return list(neo_ingest.parse_feed_page(data))
+
+
+def rebuild(db_path=neo_ingest.DB_PATH, root=CACHE_DIR, workers=None, chunk_size=5000, target=None):
+    """Rebuild ``db_path`` from scratch using only cached feed pages (no network access)."""
+    import neo_compact  # imports neo_enrich, which imports this module
+
+    cache = ResponseCache(root, offline=True)
+    entries = [(key, params) for key, params in cache.entries() if "start_date" in params]
+    # Replay in feed order: by window start, then end
+    entries.sort(key=lambda e: (e[1]["start_date"], e[1].get("end_date", "")))
+
+    started = time.perf_counter()
+    tmp_path = db_path + ".rebuild"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    neo_ingest.create_tables(conn)
+    sketches = neo_sketches.SketchSet()
+    validator = neo_validate.Validator(conn)
+
+    buffer = neo_ingest.RecordBuffer()
+    written = 0
+    workers = workers or os.cpu_count() or 1
+    keys = iter(key for key, _ in entries)
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Pages are parsed in parallel but loaded sequentially, in feed order; at most
+        # 2 per worker are parsed ahead, so memory does not grow with the cache size
+        for key in itertools.islice(keys, workers * 2):
+            in_flight.append(pool.submit(_parse_cached, (root, key)))
+        while in_flight:
+            records = in_flight.popleft().result()
+            if target is not None:
+                records = records[:target - written - len(buffer)]
+            for record in records:
+                buffer.append(record)
+                if len(buffer) >= chunk_size:
+                    written += buffer.flush(conn, sketches, validator)
+            if target is not None and written + len(buffer) >= target:
+                for future in in_flight:
+                    future.cancel()
+                break
+            for key in itertools.islice(keys, 1):
+                in_flight.append(pool.submit(_parse_cached, (root, key)))
+    written += buffer.flush(conn, sketches, validator)
+    conn.close()
+    # Keep the layout the database had; bulk loading the row store and converting once is faster
+    if neo_compact.is_compact(db_path):
+        neo_compact.build_compact(tmp_path, tmp_path, primary=True)
+    os.replace(tmp_path, db_path)
+    neo_snapshot.build_snapshot(db_path)
+
+    elapsed = time.perf_counter() - started
+    print(f"Rebuilt {db_path} from {len(entries)} cached pages: {written:,} rows "
+          f"in {elapsed:.2f}s ({written / elapsed if elapsed else 0:,.0f} rows/s)")
+    return written, elapsed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cache NeoWs feed responses and replay them locally")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    fetch = sub.add_parser("fetch", help="ingest through the cache (network only for missing pages)")
+    fetch.add_argument("--start-date", default="2024-01-01")
+    fetch.add_argument("--end-date", default="2024-01-07")
+    fetch.add_argument("--target", type=int, default=10000)
+    fetch.add_argument("--db", default=neo_ingest.DB_PATH)
+    fetch.add_argument("--cache", default=CACHE_DIR)
+    fetch.add_argument("--revalidate", action="store_true", help="send conditional requests for cached pages")
+
+    replay = sub.add_parser("rebuild", help="rebuild the database from cached pages only")
+    replay.add_argument("--db", default=neo_ingest.DB_PATH)
+    replay.add_argument("--cache", default=CACHE_DIR)
+    replay.add_argument("--workers", type=int)
+    replay.add_argument("--target", type=int)
+
+    args = parser.parse_args()
+    if args.command == "fetch":
+        cache = ResponseCache(args.cache, revalidate=args.revalidate)
+        pages = neo_ingest.fetch_feed(args.start_date, args.end_date, cache=cache)
+        neo_ingest.ingest(args.start_date, args.end_date, args.target, args.db, pages=pages)
+        print(f"Cache: {cache.hits} hits, {cache.misses} fetched, {cache.revalidated} revalidated")
+    else:
+        rebuild(args.db, args.cache, args.workers, target=args.target)
@@ -0,0 +1,342 @@
+import json
+import sqlite3
+import hashlib
+from datetime import date, datetime, timedelta, timezone
+
+import neo_sketches
+
+DB_PATH = "Asteroid_Data.db"
+
+ASTEROID_COLUMNS = ("name", "absolute_magnitude_h", "estimated_diameter_min_km",
+                    "estimated_diameter_max_km", "is_potentially_hazardous_asteroid")
+APPROACH_COLUMNS = ("relative_velocity_kmph", "astronomical", "miss_distance_km",
+                    "miss_distance_lunar", "orbiting_body")
+
+CREATE_SYNCS = '''
+CREATE TABLE IF NOT EXISTS syncs (
+    sync_id INTEGER PRIMARY KEY,
+    started_at TEXT,
+    finished_at TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    inserted INTEGER DEFAULT 0,
+    updated INTEGER DEFAULT 0,
+    deleted INTEGER DEFAULT 0,
+    unchanged INTEGER DEFAULT 0
+)
+'''
+
+CREATE_CHANGE_LOG = '''
+CREATE TABLE IF NOT EXISTS change_log (
+    change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sync_id INTEGER,
+    changed_at TEXT,
+    table_name TEXT,
+    op TEXT,
+    row_key TEXT,
+    old_values TEXT,
+    new_values TEXT
+)
+'''
+
+# Content hash of every tracked row as of the last sync, so a sync compares hashes, not rows
+CREATE_ROW_HASHES = '''
+CREATE TABLE IF NOT EXISTS row_hashes (
+    table_name TEXT,
+    row_key TEXT,
+    row_hash INTEGER,
+    PRIMARY KEY (table_name, row_key)
+) WITHOUT ROWID
+'''
+
+# Read offsets for downstream consumers (exports, caches, rollups) of the change log
+CREATE_CHANGE_CONSUMERS = '''
+CREATE TABLE IF NOT EXISTS change_consumers (
+    consumer TEXT PRIMARY KEY,
+    last_change_id INTEGER,
+    updated_at TEXT
+)
+'''
+
+INSERT_CHANGE = "INSERT INTO change_log (sync_id, changed_at, table_name, op, row_key, old_values, new_values) VALUES (?,?,?,?,?,?,?)"
+UPSERT_HASH = "INSERT OR REPLACE INTO row_hashes VALUES (?,?,?)"
+UPDATE_ASTEROID = f"UPDATE asteroids SET {', '.join(c + ' = ?' for c in ASTEROID_COLUMNS)} WHERE id = ?"
+UPDATE_APPROACH = (f"UPDATE close_approach SET {', '.join(c + ' = ?' for c in APPROACH_COLUMNS)} "
+                   "WHERE neo_reference_id = ? AND close_approach_date = ?")
+SELECT_ASTEROID = f"SELECT {', '.join(ASTEROID_COLUMNS)} FROM asteroids WHERE id = ? LIMIT 1"
+SELECT_APPROACH = (f"SELECT {', '.join(APPROACH_COLUMNS)} FROM close_approach "
+                   "WHERE neo_reference_id = ? AND close_approach_date = ? LIMIT 1")
+
+OP_COUNTS = {"insert": "inserted", "update": "updated", "delete": "deleted"}
+
+# "Since last sync" views for the dashboard; each takes the sync id as its only parameter
+change_queries = {
+    "Newly hazardous asteroids": '''
+SELECT json_extract(new_values, '$.name') AS name, row_key AS id, op,
+       json_extract(new_values, '$.estimated_diameter_max_km') AS estimated_diameter_max_km
+FROM change_log
+WHERE sync_id = ? AND table_name = 'asteroids'
+  AND json_extract(new_values, '$.is_potentially_hazardous_asteroid') = 1
+  AND (op = 'insert' OR json_extract(old_values, '$.is_potentially_hazardous_asteroid') = 0)
+''',
+    "Updated diameter estimates": '''
+SELECT json_extract(new_values, '$.name') AS name, row_key AS id,
+       json_extract(old_values, '$.estimated_diameter_min_km') AS old_min_km,
+       json_extract(new_values, '$.estimated_diameter_min_km') AS new_min_km,
+       json_extract(old_values, '$.estimated_diameter_max_km') AS old_max_km,
+       json_extract(new_values, '$.estimated_diameter_max_km') AS new_max_km
+FROM change_log
+WHERE sync_id = ? AND table_name = 'asteroids' AND op = 'update'
+  AND (json_extract(old_values, '$.estimated_diameter_min_km') IS NOT json_extract(new_values, '$.estimated_diameter_min_km')
+    OR json_extract(old_values, '$.estimated_diameter_max_km') IS NOT json_extract(new_values, '$.estimated_diameter_max_km'))
+''',
+    "New close approaches": '''
+SELECT json_extract(row_key, '$[0]') AS neo_reference_id, json_extract(row_key, '$[1]') AS close_approach_date,
+       json_extract(new_values, '$.relative_velocity_kmph') AS relative_velocity_kmph,
+       json_extract(new_values, '$.miss_distance_lunar') AS miss_distance_lunar
+FROM change_log
+WHERE sync_id = ? AND table_name = 'close_approach' AND op = 'insert'
+ORDER BY close_approach_date
+''',
+    "Removed close approaches": '''
+SELECT json_extract(row_key, '$[0]') AS neo_reference_id, json_extract(row_key, '$[1]') AS close_approach_date,
+       json_extract(old_values, '$.miss_distance_lunar') AS miss_distance_lunar
+FROM change_log
+WHERE sync_id = ? AND table_name = 'close_approach' AND op = 'delete'
+''',
+}
+
+
+def row_hash(values):
+    """Stable 63-bit content hash of a tuple of column values."""
+    digest = hashlib.blake2b(repr(values).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 1
+
+
+def _approach_key(id_, approach_date):
+    return json.dumps([id_, approach_date])
+
+
+def create_tables(conn):
+    for ddl in (CREATE_SYNCS, CREATE_CHANGE_LOG, CREATE_ROW_HASHES, CREATE_CHANGE_CONSUMERS):
+        conn.execute(ddl)
+    conn.commit()
+
+
+class ChangeTracker:
+    """Turns a load into a sync: classifies each record against the current rows and logs the delta.
+
+    Pass it to ``RecordBuffer.flush``. Asteroids are keyed by ``id`` and
+    close approaches by ``(neo_reference_id, close_approach_date)``; a key
+    that is new is inserted, a key whose content hash differs is updated in
+    place, and an identical one is left alone. Loaders report each feed
+    window they loaded in full with ``loaded_window``; ``finish`` deletes
+    approaches dated inside those windows that the feed no longer returned
+    (a window cut off at the target proves nothing) and closes the ``syncs`` row.
+    Every insert, update and delete is written to ``change_log`` with the
+    sync id, in the same transaction as the table change.
+    """
+
+    def __init__(self, conn, start_date=None, end_date=None):
+        create_tables(conn)
+        self.hashes = {"asteroids": {}, "close_approach": {}}
+        for table, key, value in conn.execute("SELECT table_name, row_key, row_hash FROM row_hashes"):
+            self.hashes[table][key] = value
+        if not self.hashes["asteroids"] and not self.hashes["close_approach"]:
+            self._baseline(conn)
+        self.counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+        self.seen = set()
+        self.loaded_dates = set()
+        self.asteroids_view = (conn.execute("SELECT type FROM sqlite_master WHERE name = 'asteroids'").fetchone()
+                               == ("view",))
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        with conn:
+            self.sync_id = conn.execute("INSERT INTO syncs (started_at, start_date, end_date) VALUES (?,?,?)",
+                                        (self.started_at, start_date, end_date)).lastrowid
+
+    def _baseline(self, conn):
+        # First sync on an existing database: hash what is already there without logging it
+        asteroids = self.hashes["asteroids"]
+        for row in conn.execute(f"SELECT id, {', '.join(ASTEROID_COLUMNS)} FROM asteroids"):
+            asteroids[str(row[0])] = row_hash(row[1:])
+        approaches = self.hashes["close_approach"]
+        for row in conn.execute(f"SELECT neo_reference_id, close_approach_date, {', '.join(APPROACH_COLUMNS)} "
+                                "FROM close_approach WHERE close_approach_date IS NOT NULL"):
+            approaches[_approach_key(row[0], row[1])] = row_hash(row[2:])
+        with conn:
+            conn.executemany(UPSERT_HASH, (("asteroids", k, v) for k, v in asteroids.items()))
+            conn.executemany(UPSERT_HASH, (("close_approach", k, v) for k, v in approaches.items()))
+
+    def _log(self, log, table, op, key, old=None, new=None):
+        log.append((self.sync_id, self.started_at, table, op, key,
+                    json.dumps(old) if old is not None else None, json.dumps(new) if new is not None else None))
+        self.counts[OP_COUNTS[op]] += 1
+
+    def apply(self, conn, buffer, rows=None):
+        """Log and apply updates for ``buffer`` rows (inside the flush transaction); returns the rows to insert."""
+        asteroid_hashes = self.hashes["asteroids"]
+        approach_hashes = self.hashes["close_approach"]
+        log, hash_updates, approach_updates = [], [], []
+        inserted = []
+        indices = range(len(buffer)) if rows is None else rows
+        for i, asteroid, approach in zip(indices, buffer.asteroid_rows(rows), buffer.close_approach_rows(rows)):
+            logged = len(log)
+            id_key = str(asteroid[0])
+            values = asteroid[1:]
+            new_hash = row_hash(values)
+            old_hash = asteroid_hashes.get(id_key)
+            if old_hash is None:
+                self._log(log, "asteroids", "insert", id_key, new=dict(zip(ASTEROID_COLUMNS, values)))
+            elif old_hash != new_hash:
+                old = conn.execute(SELECT_ASTEROID, (asteroid[0],)).fetchone()
+                conn.execute(UPDATE_ASTEROID, values + (asteroid[0],))
+                self._log(log, "asteroids", "update", id_key, dict(zip(ASTEROID_COLUMNS, old or ())),
+                          dict(zip(ASTEROID_COLUMNS, values)))
+            if old_hash != new_hash:
+                asteroid_hashes[id_key] = new_hash
+                hash_updates.append(("asteroids", id_key, new_hash))
+
+            approach_date = approach[1]
+            if approach_date is None:
+                # No key to compare on: loaded as-is, like the plain loader does
+                inserted.append(i)
+                continue
+            key = _approach_key(approach[0], approach_date)
+            self.seen.add(key)
+            values = approach[2:]
+            new_hash = row_hash(values)
+            old_hash = approach_hashes.get(key)
+            if old_hash is None:
+                inserted.append(i)
+                self._log(log, "close_approach", "insert", key, new=dict(zip(APPROACH_COLUMNS, values)))
+            elif old_hash != new_hash:
+                old = conn.execute(SELECT_APPROACH, approach[:2]).fetchone()
+                approach_updates.append(values + approach[:2])
+                self._log(log, "close_approach", "update", key, dict(zip(APPROACH_COLUMNS, old or ())),
+                          dict(zip(APPROACH_COLUMNS, values)))
+            if old_hash != new_hash:
+                approach_hashes[key] = new_hash
+                hash_updates.append(("close_approach", key, new_hash))
+            if len(log) == logged:
+                self.counts["unchanged"] += 1
+
+        conn.executemany(UPDATE_APPROACH, approach_updates)
+        conn.executemany(UPSERT_HASH, hash_updates)
+        conn.executemany(INSERT_CHANGE, log)
+        return inserted
+
+    def loaded_window(self, first, last):
+        """Record that every feed record dated ``first``..``last`` (ISO dates) was loaded in this sync."""
+        day, last = date.fromisoformat(first), date.fromisoformat(last)
+        while day <= last:
+            self.loaded_dates.add(day.isoformat())
+            day += timedelta(days=1)
+
+    def finish(self, conn, sketches=None):
+        """Delete approaches that vanished from fully loaded windows and close the sync.
+
+        ``sketches`` (the ``neo_sketches.SketchSet`` the flushes updated) is
+        recomputed from the tables when the sync updated or deleted rows:
+        flushes only fold in inserted rows, and a HyperLogLog cannot forget
+        an id.
+        """
+        log = []
+        with conn:
+            if self.loaded_dates:
+                approach_hashes = self.hashes["close_approach"]
+                # Keys are '[id, "YYYY-MM-DD"]', so the date is a fixed slice
+                gone = [key for key in approach_hashes if key[-12:-2] in self.loaded_dates and key not in self.seen]
+                # Asteroid values as they were before any paired row was deleted, by id
+                asteroid_olds = {}
+                for key in gone:
+                    id_, approach_date = json.loads(key)
+                    if id_ not in asteroid_olds:
+                        asteroid_olds[id_] = conn.execute(SELECT_ASTEROID, (id_,)).fetchone()
+                    old = conn.execute(SELECT_APPROACH, (id_, approach_date)).fetchone()
+                    removed = conn.execute("DELETE FROM close_approach WHERE neo_reference_id = ? "
+                                           "AND close_approach_date = ?", (id_, approach_date)).rowcount
+                    # Drop the paired asteroids rows as well; the compact layout derives them
+                    # from close_approach, so they went with it
+                    if not self.asteroids_view:
+                        conn.execute("DELETE FROM asteroids WHERE rowid IN "
+                                     "(SELECT rowid FROM asteroids WHERE id = ? LIMIT ?)", (id_, removed))
+                    del approach_hashes[key]
+                    conn.execute("DELETE FROM row_hashes WHERE table_name = 'close_approach' AND row_key = ?", (key,))
+                    self._log(log, "close_approach", "delete", key, old=dict(zip(APPROACH_COLUMNS, old or ())))
+                for id_, old in asteroid_olds.items():
+                    if conn.execute("SELECT 1 FROM close_approach WHERE neo_reference_id = ?", (id_,)).fetchone():
+                        continue
+                    conn.execute("DELETE FROM asteroids WHERE id = ?", (id_,))
+                    self.hashes["asteroids"].pop(str(id_), None)
+                    conn.execute("DELETE FROM row_hashes WHERE table_name = 'asteroids' AND row_key = ?", (str(id_),))
+                    # Logged once the id is gone from asteroids, whichever delete removed its last row
+                    if old is not None:
+                        self._log(log, "asteroids", "delete", str(id_), old=dict(zip(ASTEROID_COLUMNS, old)))
+            conn.executemany(INSERT_CHANGE, log)
+            conn.execute("UPDATE syncs SET finished_at = ?, inserted = ?, updated = ?, deleted = ?, unchanged = ? "
+                         "WHERE sync_id = ?", (datetime.now(timezone.utc).isoformat(), self.counts["inserted"],
+                                               self.counts["updated"], self.counts["deleted"],
+                                               self.counts["unchanged"], self.sync_id))
+            if sketches is not None and (self.counts["updated"] or self.counts["deleted"]):
+                rebuilt = neo_sketches.build_from_tables(conn)
+                rebuilt.save(conn)
+                vars(sketches).update(vars(rebuilt))
+        return self.counts
+
+
+def format_sync(tracker):
+    c = tracker.counts
+    return (f"sync {tracker.sync_id}: {c['inserted']:,} inserted, {c['updated']:,} updated, "
+            f"{c['deleted']:,} deleted rows (asteroids + close_approach), {c['unchanged']:,} records unchanged")
+
+
+def last_sync(conn):
+    """The most recent finished ``syncs`` row as a dict, or None."""
+    try:
+        cursor = conn.execute("SELECT * FROM syncs WHERE finished_at IS NOT NULL ORDER BY sync_id DESC LIMIT 1")
+    except sqlite3.OperationalError:
+        return None
+    row = cursor.fetchone()
+    return dict(zip([c[0] for c in cursor.description], row)) if row else None
+
+
+def pending_query(conn, consumer):
+    """(sql, params, upto) selecting the change_log rows ``consumer`` has not acknowledged yet.
+
+    The range is pinned to the current last change id (``upto``), so rows a
+    concurrent sync appends meanwhile are left for the next read.
+    """
+    create_tables(conn)
+    row = conn.execute("SELECT last_change_id FROM change_consumers WHERE consumer = ?", (consumer,)).fetchone()
+    upto = conn.execute("SELECT COALESCE(MAX(change_id), 0) FROM change_log").fetchone()[0]
+    return ("SELECT * FROM change_log WHERE change_id > ? AND change_id <= ? ORDER BY change_id",
+            (row[0] if row else 0, upto), upto)
+
+
+def acknowledge(conn, consumer, change_id):
+    """Advance ``consumer``'s offset so its next read starts after ``change_id``."""
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO change_consumers VALUES (?,?,?)",
+                     (consumer, change_id, datetime.now(timezone.utc).isoformat()))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect the per-sync change log")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--sync", type=int, help="print the changes of this sync (default: list syncs)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    create_tables(conn)
+    if args.sync is None:
+        for row in conn.execute("SELECT sync_id, started_at, start_date, end_date, inserted, updated, deleted, "
+                                "unchanged FROM syncs ORDER BY sync_id"):
+            print("sync {}: {} ({} .. {}) inserted={} updated={} deleted={} unchanged={}".format(*row))
+    else:
+        for table, op, key, old, new in conn.execute(
+                "SELECT table_name, op, row_key, old_values, new_values FROM change_log WHERE sync_id = ? "
+                "ORDER BY change_id", (args.sync,)):
+            print(f"{op:<7}{table:<15}{key:<28}{old or ''} -> {new or ''}")
+    conn.close()
@@ -0,0 +1,457 @@
+import os
+import math
+import time
+import sqlite3
+import statistics
+
+import neo_backend
+from neo_enrich import ENRICHED_COLUMNS
+from neo_queries import queries, filter_query
+from neo_snapshot import db_signature, refresh_snapshot
+from neo_validate import AU_KM, NEOWS_LD_KM, UNIT_TOLERANCE
+
+DB_PATH = "Asteroid_Data.db"
+
+# Picked with --benchmark: from ~100k approaches up 8 KiB gives the smallest file; 4 KiB
+# only wins on tiny files, and 64 KiB wastes most of each table's last page on them
+PAGE_SIZE = 8192
+
+# Approach dates are stored as days since 1970-01-01; date(day + UNIX_EPOCH_JD) restores them
+UNIX_EPOCH_JD = 2440587.5
+
+CREATE_ORBITING_BODIES = '''
+CREATE TABLE orbiting_bodies (
+    body_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+)
+'''
+
+# miss_distance_km is the canonical distance (the feed's most precise figure); AU and LD
+# are derived on read. ``copy`` numbers each asteroid's approaches (by day when built,
+# undated ones first), so rows are clustered by asteroid and a NULL day still has a key.
+CREATE_APPROACHES = f'''
+CREATE TABLE approaches (
+    neo_reference_id INTEGER NOT NULL,
+    copy INTEGER NOT NULL,
+    approach_day INTEGER,
+    relative_velocity_kmph REAL,
+    miss_distance_km REAL,
+    body_id INTEGER REFERENCES orbiting_bodies(body_id),
+    astronomical REAL GENERATED ALWAYS AS (miss_distance_km / {AU_KM!r}) VIRTUAL,
+    miss_distance_lunar REAL GENERATED ALWAYS AS (miss_distance_km / {NEOWS_LD_KM!r}) VIRTUAL,
+    PRIMARY KEY (neo_reference_id, copy)
+) WITHOUT ROWID
+'''
+
+INSERT_APPROACHES = f'''
+INSERT INTO approaches (neo_reference_id, copy, approach_day, relative_velocity_kmph, miss_distance_km, body_id)
+SELECT ca.neo_reference_id,
+       ROW_NUMBER() OVER (PARTITION BY ca.neo_reference_id ORDER BY ca.day, ca.rowid) - 1, ca.day,
+       ca.relative_velocity_kmph, ca.miss_distance_km, b.body_id
+FROM (SELECT rowid, *, CAST(julianday(close_approach_date) - {UNIX_EPOCH_JD!r} AS INTEGER) AS day
+      FROM src.close_approach) ca
+LEFT JOIN orbiting_bodies b ON b.name = ca.orbiting_body
+ORDER BY 1, 2
+'''
+
+# Compatibility views: same names, columns and column order as the row-store tables.
+# The asteroids view repeats each asteroid once per close approach, the way every loader
+# writes them, so asteroid_info stores an asteroid once. Body ids are decoded with a CASE
+# over the dictionary as built (SQLite would join orbiting_bodies on every row otherwise),
+# falling back to a lookup for bodies first seen after that.
+CREATE_CLOSE_APPROACH_VIEW = f'''
+CREATE VIEW close_approach AS
+SELECT neo_reference_id, date(approach_day + {UNIX_EPOCH_JD!r}) AS close_approach_date,
+       relative_velocity_kmph, astronomical, miss_distance_km, miss_distance_lunar,
+       {{orbiting_body}} AS orbiting_body
+FROM approaches
+'''
+
+
+def _day(value):
+    return f"CAST(julianday({value}) - {UNIX_EPOCH_JD!r} AS INTEGER)"
+
+
+def _unrepresentable(row=""):
+    # A close_approach row the encoding cannot give back unchanged: no key, a date that is
+    # not YYYY-MM-DD, AU/LD present without km (or the reverse), or AU/LD that disagree with
+    # km beyond the ingest validator's tolerance
+    km = f"{row}miss_distance_km"
+    return (f"{row}neo_reference_id IS NULL"
+            f" OR date({_day(row + 'close_approach_date')} + {UNIX_EPOCH_JD!r}) IS NOT {row}close_approach_date"
+            f" OR ({km} IS NULL) <> ({row}astronomical IS NULL)"
+            f" OR ({km} IS NULL) <> ({row}miss_distance_lunar IS NULL)"
+            f" OR abs({row}astronomical * {AU_KM!r} - {km}) > {UNIT_TOLERANCE!r} * abs({km})"
+            f" OR abs({row}miss_distance_lunar * {NEOWS_LD_KM!r} - {km}) > {UNIT_TOLERANCE!r} * abs({km})")
+
+
+# Rows the compact encoding cannot reproduce, and how far the stored AU/LD are from km
+CHECK_APPROACHES = f'''
+SELECT COALESCE(SUM({_unrepresentable()}), 0),
+       MAX(MAX(abs(astronomical * {AU_KM!r} - miss_distance_km),
+               abs(miss_distance_lunar * {NEOWS_LD_KM!r} - miss_distance_km)) / miss_distance_km)
+FROM src.close_approach
+'''
+
+# Asteroids rows the layout cannot hold: without an id, differing between rows of one id,
+# or not one per close approach of that id
+CHECK_ASTEROIDS = '''
+SELECT (SELECT COUNT(*) FROM src.asteroids WHERE id IS NULL),
+       (SELECT COUNT(*) FROM (SELECT DISTINCT {columns} FROM src.asteroids))
+           - (SELECT COUNT(DISTINCT id) FROM src.asteroids),
+       (SELECT COUNT(*) FROM (SELECT id FROM (SELECT id, 1 AS n FROM src.asteroids
+                                              UNION ALL SELECT neo_reference_id, -1 FROM src.close_approach)
+                              GROUP BY id HAVING SUM(n) <> 0))
+'''
+
+# The stored approach a close_approach view row (OLD) comes from; identical rows are
+# interchangeable, so the first match will do
+_OLD_APPROACH = f'''(SELECT copy FROM approaches
+        WHERE neo_reference_id = OLD.neo_reference_id AND approach_day IS {_day("OLD.close_approach_date")}
+          AND relative_velocity_kmph IS OLD.relative_velocity_kmph AND miss_distance_km IS OLD.miss_distance_km
+          AND body_id IS (SELECT body_id FROM orbiting_bodies WHERE name = OLD.orbiting_body)
+        LIMIT 1)'''
+_NEXT_COPY = "(SELECT COALESCE(MAX(copy) + 1, 0) FROM approaches WHERE neo_reference_id = NEW.neo_reference_id)"
+_NEW_BODY = "(SELECT body_id FROM orbiting_bodies WHERE name = NEW.orbiting_body)"
+_ADD_NEW_BODY = (f"INSERT INTO orbiting_bodies (name) SELECT NEW.orbiting_body "
+                 f"WHERE NEW.orbiting_body IS NOT NULL AND {_NEW_BODY} IS NULL;")
+# Once an asteroid's last approach is gone, so are all its asteroids rows
+_DROP_ORPHAN = ("DELETE FROM asteroid_info WHERE id = OLD.neo_reference_id "
+                "AND NOT EXISTS (SELECT 1 FROM approaches WHERE neo_reference_id = OLD.neo_reference_id);")
+
+CLOSE_APPROACH_TRIGGERS = f'''
+CREATE TRIGGER close_approach_insert INSTEAD OF INSERT ON close_approach
+BEGIN
+    SELECT RAISE(ABORT, 'close_approach row cannot be stored in the compact layout')
+    WHERE {_unrepresentable("NEW.")};
+    {_ADD_NEW_BODY}
+    INSERT INTO approaches (neo_reference_id, copy, approach_day, relative_velocity_kmph, miss_distance_km, body_id)
+    VALUES (NEW.neo_reference_id, {_NEXT_COPY}, {_day("NEW.close_approach_date")},
+            NEW.relative_velocity_kmph, NEW.miss_distance_km, {_NEW_BODY});
+END;
+CREATE TRIGGER close_approach_update INSTEAD OF UPDATE ON close_approach
+BEGIN
+    SELECT RAISE(ABORT, 'close_approach row cannot be stored in the compact layout')
+    WHERE {_unrepresentable("NEW.")};
+    {_ADD_NEW_BODY}
+    UPDATE approaches
+    SET neo_reference_id = NEW.neo_reference_id,
+        copy = CASE WHEN NEW.neo_reference_id = OLD.neo_reference_id THEN copy ELSE {_NEXT_COPY} END,
+        approach_day = {_day("NEW.close_approach_date")}, relative_velocity_kmph = NEW.relative_velocity_kmph,
+        miss_distance_km = NEW.miss_distance_km, body_id = {_NEW_BODY}
+    WHERE neo_reference_id = OLD.neo_reference_id AND copy = {_OLD_APPROACH};
+    {_DROP_ORPHAN}
+END;
+CREATE TRIGGER close_approach_delete INSTEAD OF DELETE ON close_approach
+BEGIN
+    DELETE FROM approaches WHERE neo_reference_id = OLD.neo_reference_id AND copy = {_OLD_APPROACH};
+    {_DROP_ORPHAN}
+END;
+'''
+
+ASTEROIDS_TRIGGERS = '''
+CREATE TRIGGER asteroids_insert INSTEAD OF INSERT ON asteroids
+BEGIN
+    SELECT RAISE(ABORT, 'asteroids.id is required in the compact layout') WHERE NEW.id IS NULL;
+    INSERT INTO asteroid_info (id, {columns}) VALUES (NEW.id, {new_values})
+    ON CONFLICT (id) DO UPDATE SET {upsert};
+END;
+CREATE TRIGGER asteroids_update INSTEAD OF UPDATE ON asteroids
+BEGIN
+    SELECT RAISE(ABORT, 'asteroids.id cannot be changed in the compact layout') WHERE NEW.id IS NOT OLD.id;
+    UPDATE asteroid_info SET {update} WHERE id = OLD.id;
+END;
+CREATE TRIGGER asteroids_delete INSTEAD OF DELETE ON asteroids
+BEGIN
+    DELETE FROM asteroid_info WHERE id = OLD.id;
+END;
+'''
+
+
+def compact_path_for(db_path):
+    """Compact copy kept next to the SQLite database it was built from."""
+    return os.path.splitext(db_path)[0] + ".compact.db"
+
+
+def _body_case(conn):
+    whens = conn.execute("SELECT group_concat('WHEN ' || body_id || ' THEN ' || quote(name), ' ') "
+                         "FROM (SELECT body_id, name FROM orbiting_bodies ORDER BY body_id)").fetchone()[0]
+    lookup = "(SELECT name FROM orbiting_bodies b WHERE b.body_id = approaches.body_id)"
+    return f"CASE body_id {whens} ELSE {lookup} END" if whens else lookup
+
+
+def _asteroid_ddl(columns):
+    # Same columns as the source plus the enrichment ones, so neo_enrich never has to
+    # ALTER the view; one row per id, keyed by the rowid
+    defs = ["id INTEGER PRIMARY KEY"]
+    defs += [" ".join(filter(None, (name, declared, "NOT NULL" if notnull else "")))
+             for name, declared, notnull in columns if name != "id"]
+    return "CREATE TABLE asteroid_info (\n    " + ",\n    ".join(defs) + "\n)"
+
+
+def create_views(conn):
+    """(Re)create the compatibility views and the triggers that route their writes to the tables."""
+    names = [row[1] for row in conn.execute("PRAGMA table_info(asteroid_info)")]
+    others = [name for name in names if name != "id"]
+    enriched = {name for name, _ in ENRICHED_COLUMNS}
+    conn.execute("DROP VIEW IF EXISTS main.asteroids")
+    conn.execute("DROP VIEW IF EXISTS main.close_approach")
+    conn.execute(f"CREATE VIEW asteroids AS SELECT {', '.join('a.' + name for name in names)} "
+                 f"FROM approaches ap JOIN asteroid_info a ON a.id = ap.neo_reference_id")
+    conn.execute(CREATE_CLOSE_APPROACH_VIEW.format(orbiting_body=_body_case(conn)))
+    conn.executescript(CLOSE_APPROACH_TRIGGERS + ASTEROIDS_TRIGGERS.format(
+        columns=", ".join(others),
+        new_values=", ".join("NEW." + name for name in others),
+        # A re-loaded asteroid keeps its enrichment; loaders do not send those columns
+        upsert=", ".join(f"{name} = COALESCE(excluded.{name}, {name})" if name in enriched
+                         else f"{name} = excluded.{name}" for name in others),
+        update=", ".join(f"{name} = NEW.{name}" for name in others)))
+
+
+def is_compact(db_path):
+    """True if ``db_path`` itself uses the compact layout (see ``convert``)."""
+    if not os.path.exists(db_path):
+        return False
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'asteroid_info'").fetchone() is not None
+    finally:
+        conn.close()
+
+
+def _copy_other_tables(conn):
+    # Everything but the two encoded tables (syncs, change log, sketches, orbits, ...), as is
+    objects = conn.execute("SELECT type, name, sql FROM src.sqlite_master WHERE sql IS NOT NULL "
+                           "AND tbl_name NOT IN ('asteroids', 'close_approach') AND name NOT LIKE 'sqlite_%' "
+                           "ORDER BY type = 'table' DESC").fetchall()
+    for kind, name, sql in objects:
+        conn.execute(sql)
+        if kind == "table":
+            conn.execute(f'INSERT INTO main."{name}" SELECT * FROM src."{name}"')
+    if conn.execute("SELECT 1 FROM src.sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+        conn.execute("DELETE FROM main.sqlite_sequence")
+        conn.execute("INSERT INTO main.sqlite_sequence SELECT * FROM src.sqlite_sequence")
+
+
+def build_compact(db_path=DB_PATH, out_path=None, page_size=PAGE_SIZE, primary=False):
+    """Write the compact encoding of ``db_path``'s asteroids/close_approach tables.
+
+    With ``primary`` every other table comes along, so the file can replace
+    ``db_path`` (see ``convert``); otherwise it is a read copy that records
+    which state of ``db_path`` it was built from. Raises ValueError if a row
+    cannot be reproduced exactly through the compatibility views (see
+    CHECK_APPROACHES and CHECK_ASTEROIDS).
+    """
+    out_path = out_path or compact_path_for(db_path)
+    tmp = neo_backend.temp_path_for(out_path)
+    started = time.perf_counter()
+    conn = sqlite3.connect(tmp)
+    try:
+        # Must precede the first table; the build file is replaced atomically, so no journal
+        conn.execute(f"PRAGMA page_size = {int(page_size)}")
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("ATTACH DATABASE ? AS src", (db_path,))
+        unrepresentable, deviation = conn.execute(CHECK_APPROACHES).fetchone()
+        if unrepresentable:
+            raise ValueError(f"{db_path}: {unrepresentable} close_approach rows cannot be encoded compactly "
+                             f"(largest AU/LD vs km deviation {deviation or 0.0:.2g})")
+        source = [(name, declared, notnull) for _, name, declared, notnull, *_ in
+                  conn.execute("PRAGMA src.table_info(asteroids)")]
+        source_names = [name for name, _, _ in source]
+        no_id, differing, unpaired = conn.execute(CHECK_ASTEROIDS.format(columns=", ".join(source_names))).fetchone()
+        if no_id:
+            raise ValueError(f"{db_path}: asteroids rows without an id cannot be encoded compactly")
+        if differing or unpaired:
+            raise ValueError(f"{db_path}: the compact layout stores an asteroid once and repeats it per close "
+                             f"approach, but {differing} ids have differing asteroids rows and {unpaired} a "
+                             f"different number of asteroids and close_approach rows")
+        columns = source + [(name, sql_type, 0) for name, sql_type in ENRICHED_COLUMNS if name not in source_names]
+        others = ", ".join(name for name in source_names if name != "id")
+        with conn:
+            conn.execute(_asteroid_ddl(columns))
+            conn.execute(f"INSERT INTO asteroid_info (id, {others}) "
+                         f"SELECT id, {others} FROM src.asteroids GROUP BY id ORDER BY id")
+            conn.execute(CREATE_ORBITING_BODIES)
+            conn.execute("INSERT INTO orbiting_bodies (name) SELECT DISTINCT orbiting_body FROM src.close_approach "
+                         "WHERE orbiting_body IS NOT NULL ORDER BY 1")
+            conn.execute(CREATE_APPROACHES)
+            conn.execute(INSERT_APPROACHES)
+            if primary:
+                _copy_other_tables(conn)
+            else:
+                conn.execute("CREATE TABLE compact_source (db_path TEXT, size INTEGER, mtime_ns INTEGER)")
+                size, mtime_ns = db_signature(db_path)
+                conn.execute("INSERT INTO compact_source VALUES (?, ?, ?)", (os.path.abspath(db_path), size, mtime_ns))
+        create_views(conn)
+        conn.execute("DETACH DATABASE src")
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM")
+    except BaseException:
+        conn.close()
+        os.remove(tmp)
+        raise
+    conn.close()
+    os.replace(tmp, out_path)
+    print(f"Wrote {out_path} ({os.path.getsize(out_path):,} bytes, {page_size:,} B pages) "
+          f"in {time.perf_counter() - started:.2f}s")
+    return out_path
+
+
+def convert(db_path=DB_PATH, page_size=PAGE_SIZE):
+    """Switch ``db_path`` itself to the compact layout, in place.
+
+    Ingest, sync, enrichment and every reader keep working on it: they use
+    the ``asteroids``/``close_approach`` views, whose INSTEAD OF triggers
+    turn inserts, updates and deletes into writes to the encoded tables.
+    """
+    if is_compact(db_path):
+        print(f"{db_path} already uses the compact layout")
+        return db_path
+    build_compact(db_path, db_path, page_size, primary=True)
+    refresh_snapshot(db_path)
+    return db_path
+
+
+def is_current(db_path, compact_path):
+    """True if ``compact_path`` was built from ``db_path`` as it is now."""
+    if not os.path.exists(compact_path):
+        return False
+    try:
+        conn = sqlite3.connect(f"file:{compact_path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT size, mtime_ns FROM compact_source").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    return row is not None and list(row) == db_signature(db_path)
+
+
+def footprint(path):
+    """File size and per-table bytes (dbstat when this SQLite has it)."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        try:
+            tables = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))
+        except sqlite3.OperationalError:
+            tables = {}
+    finally:
+        conn.close()
+    return {"bytes": os.path.getsize(path), "page_size": page_size, "tables": tables}
+
+
+# Scans timed next to the query catalog: raw table reads, the join every
+# dashboard view does, and the Advanced Filters query at its default settings
+SCANS = {
+    "scan: every close_approach column": "SELECT * FROM close_approach",
+    "scan: SUM(miss_distance_km)": "SELECT COUNT(*), SUM(miss_distance_km) FROM close_approach",
+    "scan: approaches per month": '''
+        SELECT strftime('%Y-%m', close_approach_date) AS month, COUNT(*) FROM close_approach GROUP BY month
+    ''',
+    "join: approaches x asteroids": '''
+        SELECT COUNT(*) FROM close_approach ca JOIN asteroids a ON ca.neo_reference_id = a.id
+    ''',
+    "dashboard filters (defaults)": filter_query("2024-01-01", 0.0, 0.05, 0.0, 10.0, 0.0, 50000.0, 0.0, 5.0),
+}
+
+
+def _timed(path, sql, repeat):
+    # A new connection per run, so SQLite's page cache starts empty (the OS cache stays warm)
+    samples, rows = [], None
+    for _ in range(repeat):
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        started = time.perf_counter()
+        rows = conn.execute(sql).fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+        conn.close()
+    return statistics.median(samples), rows
+
+
+def _same(a, b):
+    # AU/LD are recomputed from km in the compact file, so floats agree to ~1e-8, not bit for bit
+    if len(a) != len(b):
+        return False
+
+    def key(row):
+        return tuple((0, f"{v:.6g}") if isinstance(v, float) else (1, str(v)) for v in row)
+
+    for x, y in zip(sorted(a, key=key), sorted(b, key=key)):
+        for u, v in zip(x, y):
+            if isinstance(u, float) and isinstance(v, (int, float)):
+                if not math.isclose(u, v, rel_tol=1e-7, abs_tol=1e-12):
+                    return False
+            elif u != v:
+                return False
+    return True
+
+
+def benchmark(db_path=DB_PATH, scales=(1, 10, 50), repeat=3, page_sizes=(4096, 8192, 16384, 65536), workdir=None):
+    """File size per page size, then scan and catalog query times, row store vs compact.
+
+    The row store at each scale is ``neo_backend.scaled_copy`` of ``db_path``;
+    timings (median of ``repeat``) use the PAGE_SIZE build and include
+    fetching every row, and results are compared between the two files.
+    """
+    import tempfile
+
+    workdir = workdir or tempfile.mkdtemp(prefix="neo_compact_")
+    results = []
+    for scale in scales:
+        row_path = neo_backend.scaled_copy(db_path, os.path.join(workdir, f"scale_{scale}.db"), scale)
+        # VACUUM so the baseline has no free pages either
+        sqlite3.connect(row_path, isolation_level=None).execute("VACUUM")
+        rows = sqlite3.connect(row_path).execute("SELECT COUNT(*) FROM close_approach").fetchone()[0]
+        base = footprint(row_path)
+        print(f"\nScale x{scale}: {rows:,} approaches")
+        print(f"{'layout':<24}{'bytes':>14}{'B/approach':>12}{'vs row':>9}")
+        print(f"{'row store':<24}{base['bytes']:>14,}{base['bytes'] / rows:>12.1f}{'':>9}")
+        compact_path = None
+        for page_size in page_sizes:
+            path = os.path.join(workdir, f"scale_{scale}.p{page_size}.compact.db")
+            build_compact(row_path, path, page_size)
+            size = footprint(path)["bytes"]
+            print(f"{f'compact, {page_size} B pages':<24}{size:>14,}{size / rows:>12.1f}"
+                  f"{(size - base['bytes']) / base['bytes']:>+9.0%}")
+            results.append({"scale": scale, "rows": rows, "layout": f"compact/{page_size}",
+                            "bytes": size, "row_bytes": base["bytes"]})
+            if page_size == PAGE_SIZE or compact_path is None:
+                compact_path = path
+
+        print(f"{'scan / query':<46}{'row ms':>9}{'compact ms':>12}{'speedup':>9}  same")
+        totals = [0.0, 0.0]
+        for name, sql in list(SCANS.items()) + list(queries.items()):
+            row_ms, expected = _timed(row_path, sql, repeat)
+            compact_ms, got = _timed(compact_path, sql, repeat)
+            totals[0] += row_ms
+            totals[1] += compact_ms
+            same = _same(expected, got)
+            print(f"{name[:45]:<46}{row_ms:>9.1f}{compact_ms:>12.1f}{row_ms / compact_ms:>8.1f}x  "
+                  f"{'yes' if same else 'NO'}")
+            results.append({"scale": scale, "rows": rows, "query": name, "row_ms": row_ms,
+                            "compact_ms": compact_ms, "same": same})
+        print(f"{'total':<46}{totals[0]:>9.1f}{totals[1]:>12.1f}{totals[0] / totals[1]:>8.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compact storage layout of the NEO database: convert, build and benchmark")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--convert", action="store_true", help="switch --db itself to the compact layout")
+    parser.add_argument("--build", action="store_true", help="(re)build a compact read copy of --db")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--benchmark", action="store_true", help="compare size and scan times with the row store")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.convert:
+        convert(args.db, args.page_size)
+    if args.build:
+        build_compact(args.db, page_size=args.page_size)
+    if args.benchmark:
+        benchmark(args.db, args.scales, args.repeat)
+    if not (args.convert or args.build or args.benchmark):
+        parser.print_help()
@@ -0,0 +1,181 @@
+import time
+import itertools
+import random
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+import neo_cache
+import neo_ingest
+import neo_orbits
+import neo_snapshot
+
+DB_PATH = "Asteroid_Data.db"
+
+# Columns added to asteroids by enrichment (name, SQL type); the notebook's outline lists
+# nasa_jpl_url and sentry_object, orbit_class comes from the lookup's orbital_data
+ENRICHED_COLUMNS = [
+    ("orbit_class", "TEXT"),
+    ("nasa_jpl_url", "TEXT"),
+    ("sentry_object", "BOOLEAN"),
+    ("enriched_at", "TEXT"),
+]
+
+UPDATE_ASTEROID = '''
+UPDATE asteroids
+SET orbit_class = ?, nasa_jpl_url = ?, sentry_object = ?, enriched_at = ?
+WHERE id = ?
+'''
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class NotFound(Exception):
+    pass
+
+
+def add_enriched_columns(conn):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(asteroids)")}
+    for name, sql_type in ENRICHED_COLUMNS:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE asteroids ADD COLUMN {name} {sql_type}")
+    conn.commit()
+
+
+def missing_ids(conn):
+    """Distinct asteroid ids that have not been enriched yet."""
+    return [row[0] for row in conn.execute("SELECT DISTINCT id FROM asteroids WHERE enriched_at IS NULL")]
+
+
+class LookupClient:
+    """Thread-safe ``neo/{id}`` client: one session per thread, retry with backoff, responses cached on disk."""
+
+    def __init__(self, cache, api_key=neo_ingest.API_KEY, retries=4, backoff=0.5):
+        self.cache = cache
+        self.api_key = api_key
+        self.retries = retries
+        self.backoff = backoff
+        self._local = threading.local()
+
+    def _session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def lookup(self, id_):
+        url = neo_ingest.LOOKUP_URL.format(id=id_, api_key=self.api_key)
+        for attempt in range(self.retries + 1):
+            try:
+                return self.cache.get(url, self._session())
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status == 404:
+                    raise NotFound(id_)
+                if status not in RETRY_STATUS or attempt == self.retries:
+                    raise
+                retry_after = e.response.headers.get("Retry-After")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else None
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                delay = None
+            # Exponential backoff with jitter unless the server told us how long to wait
+            time.sleep(delay if delay is not None else self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+
+def enrichment_row(id_, neo, enriched_at):
+    if neo is None:
+        # Unknown to the lookup endpoint: mark as done so re-runs skip it
+        return (None, None, None, enriched_at, id_)
+    orbit_class = ((neo.get("orbital_data") or {}).get("orbit_class") or {}).get("orbit_class_type")
+    return (orbit_class, neo.get("nasa_jpl_url"), neo.get("is_sentry_object"), enriched_at, id_)
+
+
+def enrich(db_path=DB_PATH, workers=8, batch_size=500, limit=None, cache_root=neo_cache.CACHE_DIR):
+    """Fetch ``neo/{id}`` details for every un-enriched asteroid and upsert them in bulk.
+
+    Lookups run on a bounded thread pool; each completed batch is written in
+    one transaction (asteroid columns plus orbital_elements for neo_orbits.py),
+    so an interrupted run keeps its progress and a re-run only fetches what is
+    still missing.
+    """
+    conn = sqlite3.connect(db_path)
+    add_enriched_columns(conn)
+    conn.execute(neo_orbits.CREATE_ORBITAL_ELEMENTS)
+    ids = missing_ids(conn)[:limit]
+    if not ids:
+        conn.close()
+        # Adding the enrichment columns may still have changed the file
+        neo_snapshot.refresh_snapshot(db_path)
+        print("All asteroids already enriched.")
+        return 0
+
+    cache = neo_cache.ResponseCache(cache_root)
+    client = LookupClient(cache)
+    started = time.perf_counter()
+    done = failed = 0
+    updates, elements = [], []
+
+    def flush():
+        with conn:
+            conn.executemany(UPDATE_ASTEROID, updates)
+            neo_orbits.store_elements(conn, elements)
+        updates.clear()
+        elements.clear()
+
+    pending_ids = iter(ids)
+    futures = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def submit(n):
+            for id_ in itertools.islice(pending_ids, n):
+                futures[pool.submit(client.lookup, id_)] = id_
+
+        # At most 2 lookups per worker in flight; each decoded response (with the object's
+        # full approach history) is dropped as soon as its row is built
+        submit(workers * 2)
+        while futures:
+            completed, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in completed:
+                id_ = futures.pop(future)
+                try:
+                    neo = future.result()
+                except NotFound:
+                    neo = None
+                except Exception as e:
+                    # Left un-enriched, so the next run retries it
+                    print(f"Lookup failed for {id_}: {e}")
+                    failed += 1
+                    continue
+                updates.append(enrichment_row(id_, neo, datetime.now(timezone.utc).isoformat()))
+                element_row = neo_orbits.parse_orbital_data(neo) if neo else None
+                if element_row:
+                    elements.append(element_row)
+                done += 1
+                if len(updates) >= batch_size:
+                    flush()
+            submit(len(completed))
+    flush()
+    conn.close()
+    neo_snapshot.refresh_snapshot(db_path)
+
+    elapsed = time.perf_counter() - started
+    print(f"Enriched {done:,} asteroids ({failed} failed) in {elapsed:.2f}s "
+          f"({done / elapsed if elapsed else 0:,.1f}/s); cache: {cache.hits} hits, {cache.misses} fetched")
+    return done
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Enrich asteroids with details from the NEO lookup endpoint")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--cache", default=neo_cache.CACHE_DIR)
+    args = parser.parse_args()
+
+    enrich(args.db, args.workers, args.batch_size, args.limit, args.cache)
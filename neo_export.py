@@ -0,0 +1,207 @@
+import io
+import os
+import csv
+import gzip
+import itertools
+import sqlite3
+import tempfile
+import tracemalloc
+
+import neo_changes
+import neo_snapshot
+from neo_queries import queries
+
+DB_PATH = "Asteroid_Data.db"
+CHUNK_SIZE = 10000
+
+FORMATS = {
+    # format: (file extension, MIME type)
+    "csv": (".csv", "text/csv"),
+    "csv.gz": (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def stream_rows(conn, query, params=(), chunk_size=CHUNK_SIZE):
+    """Run ``query`` and yield (column names, list of rows) one ``fetchmany`` chunk at a time.
+
+    An empty result still yields its column names once, with no rows.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        columns = [c[0] for c in cursor.description]
+        rows = cursor.fetchmany(chunk_size)
+        yield columns, rows
+        while rows:
+            rows = cursor.fetchmany(chunk_size)
+            if rows:
+                yield columns, rows
+    finally:
+        cursor.close()
+
+
+def _write_csv(chunks, f):
+    text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    header_written = False
+    for columns, rows in chunks:
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+    text.flush()
+    text.detach()
+
+
+# Column affinity (as reported for CREATE TABLE ... AS SELECT) -> storage class; NUMERIC
+# columns here are the 0/1 booleans, which SQLite stores as integers
+AFFINITY_CLASSES = {"INT": "integer", "NUM": "integer", "REAL": "real", "TEXT": "text"}
+
+
+def _declared_types(conn, body, params):
+    # An empty CREATE TABLE AS gives each result column the affinity of its expression
+    # (the declared type for table columns, none for most computed ones)
+    conn.execute(f"CREATE TEMP TABLE _export_types AS SELECT * FROM (\n{body}\n) LIMIT 0", params)
+    try:
+        return [declared for _, _, declared, *_ in conn.execute("PRAGMA temp.table_info(_export_types)")]
+    finally:
+        conn.execute("DROP TABLE temp._export_types")
+
+
+def _column_types(conn, query, params, n_columns):
+    """Storage classes seen in each result column: one pass over the whole result.
+
+    SQLite results carry no types and a column may mix integers and reals,
+    or be NULL for the first thousands of rows, so one chunk is not enough.
+    Columns with no values at all take their declared affinity (text if none).
+    """
+    names = [f"c{i}" for i in range(n_columns)]
+    classes = ("integer", "real", "text", "blob")
+    checks = ", ".join(f"MAX(typeof({name}) = '{kind}')" for name in names for kind in classes)
+    # The query goes on lines of its own, so a trailing -- comment cannot swallow the paren
+    body = query.strip().rstrip(";")
+    row = conn.execute(f"WITH _result({', '.join(names)}) AS (\n{body}\n) SELECT {checks} FROM _result",
+                       params).fetchone()
+    kinds = [{kind for k, kind in enumerate(classes) if row[i * len(classes) + k]} for i in range(n_columns)]
+    if not all(kinds):
+        declared = _declared_types(conn, body, params)
+        kinds = [found or {AFFINITY_CLASSES.get(declared[i], "text")} for i, found in enumerate(kinds)]
+    return kinds
+
+
+def _arrow_type(pa, kinds):
+    if "text" in kinds or ("blob" in kinds and len(kinds) > 1):
+        return pa.string()
+    if kinds == {"blob"}:
+        return pa.binary()
+    if "real" in kinds:
+        return pa.float64()
+    return pa.int64()
+
+
+def _write_parquet(chunks, f, column_types):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+
+    writer = None
+    try:
+        for columns, rows in chunks:
+            if writer is None:
+                schema = pa.schema([pa.field(name, _arrow_type(pa, kinds)) for name, kinds in zip(columns, column_types)])
+                writer = pq.ParquetWriter(f, schema)
+            arrays = []
+            for i, field in enumerate(schema):
+                values = [row[i] for row in rows]
+                if pa.types.is_string(field.type):
+                    values = [None if v is None else str(v) for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            # Each chunk becomes one row group, so only one chunk is ever held in memory
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def export(conn, query, f, fmt="csv", params=(), chunk_size=CHUNK_SIZE):
+    """Stream the result of ``query`` into the binary file object ``f`` as csv, csv.gz or parquet."""
+    chunks = stream_rows(conn, query, params, chunk_size)
+    if fmt == "csv":
+        _write_csv(chunks, f)
+    elif fmt == "csv.gz":
+        with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+            _write_csv(chunks, gz)
+    elif fmt == "parquet":
+        columns, rows = next(chunks)
+        types = _column_types(conn, query, params, len(columns))
+        _write_parquet(itertools.chain([(columns, rows)], chunks), f, types)
+    else:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {sorted(FORMATS)}")
+
+
+def export_to_tempfile(db_path, query, fmt="csv", params=(), chunk_size=CHUNK_SIZE):
+    """Export into an on-disk temp file and return it rewound (used by the download buttons)."""
+    f = tempfile.TemporaryFile()
+    conn = sqlite3.connect(db_path)
+    try:
+        export(conn, query, f, fmt, params, chunk_size)
+    finally:
+        conn.close()
+    f.seek(0)
+    return f
+
+
+def download_button(st, label, query, fmt, file_stem, db_path=DB_PATH, key=None):
+    """Streamlit download button that runs the export only when clicked."""
+    extension, mime = FORMATS[fmt]
+    return st.download_button(
+        label,
+        data=lambda: export_to_tempfile(db_path, query, fmt),
+        file_name=file_stem + extension,
+        mime=mime,
+        key=key,
+        on_click="ignore",
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream a query result from Asteroid_Data.db to CSV/Parquet")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--query", choices=sorted(queries), metavar="NAME", help="name of a predefined query")
+    source.add_argument("--sql", help="arbitrary SELECT statement")
+    source.add_argument("--changes", metavar="CONSUMER",
+                        help="change_log rows this consumer has not exported yet (then marks them done)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--output", "-o", required=True)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--report", action="store_true", help="print peak traced memory of the export")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    params = ()
+    if args.changes:
+        # Only the delta since this consumer's last export, not a rescan of the tables
+        sql, params, upto = neo_changes.pending_query(conn, args.changes)
+    else:
+        sql = queries[args.query] if args.query else args.sql
+    if args.report:
+        if args.format == "parquet":
+            import pyarrow.parquet  # keep the one-off import cost out of the measurement
+        tracemalloc.start()
+    with open(args.output, "wb") as out:
+        export(conn, sql, out, args.format, params, chunk_size=args.chunk_size)
+    if args.changes:
+        neo_changes.acknowledge(conn, args.changes, upto)
+    conn.close()
+    print(f"Wrote {args.output} ({os.path.getsize(args.output):,} bytes)")
+    if args.report:
+        print(f"Peak traced memory: {tracemalloc.get_traced_memory()[1] / 1e6:.1f} MB")
+    if args.changes:
+        # Acknowledging wrote to the database, which invalidates the dashboard snapshot
+        neo_snapshot.refresh_snapshot(args.db)
@@ -0,0 +1,397 @@
+import os
+import sys
+import sqlite3
+import resource
+import tracemalloc
+from array import array
+
+import requests
+
+import neo_changes
+import neo_sketches
+import neo_snapshot
+import neo_validate
+
+# NASA NeoWs feed endpoint (max 7 days per request, pagination via links.next)
+API_KEY = os.environ.get("NASA_API_KEY", "DEMO_KEY")
+# Point NASA_API_BASE at a local stub server to run the pipeline offline
+API_BASE = os.environ.get("NASA_API_BASE", "https://api.nasa.gov/neo/rest/v1")
+FEED_URL = API_BASE + "/feed?start_date={start_date}&end_date={end_date}&api_key={api_key}"
+LOOKUP_URL = API_BASE + "/neo/{id}?api_key={api_key}"
+
+DB_PATH = "Asteroid_Data.db"
+
+# Same tables as the notebook's "Sql Insertion" step
+CREATE_ASTEROIDS = '''
+CREATE TABLE IF NOT EXISTS asteroids (
+    id INTEGER,
+    name TEXT NOT NULL,
+    absolute_magnitude_h REAL,
+    estimated_diameter_min_km REAL,
+    estimated_diameter_max_km REAL,
+    is_potentially_hazardous_asteroid BOOLEAN
+)
+'''
+
+CREATE_CLOSE_APPROACH = '''
+CREATE TABLE IF NOT EXISTS close_approach (
+    neo_reference_id INTEGER,
+    close_approach_date TEXT,
+    relative_velocity_kmph REAL,
+    astronomical REAL,
+    miss_distance_km REAL,
+    miss_distance_lunar REAL,
+    orbiting_body TEXT,
+    FOREIGN KEY (neo_reference_id) REFERENCES asteroids(id)
+)
+'''
+
+# Columns are named because enrichment (neo_enrich.py) adds more to asteroids
+INSERT_ASTEROID = '''insert into asteroids (id, name, absolute_magnitude_h, estimated_diameter_min_km,
+    estimated_diameter_max_km, is_potentially_hazardous_asteroid) values(?,?,?,?,?,?)'''
+INSERT_CLOSE_APPROACH = "insert into close_approach values(?,?,?,?,?,?,?)"
+
+# Column order of one parsed record (the notebook's asteroid_info dict, minus 's.no')
+FIELDS = (
+    'id', 'neo_reference_id', 'name', 'absolute_magnitude_h',
+    'estimated_diameter_min_km', 'estimated_diameter_max_km',
+    'is_potentially_hazardous_asteroid', 'close_approach_date',
+    'relative_velocity_kmph', 'astronomical', 'miss_distance_km',
+    'miss_distance_lunar', 'orbiting_body',
+)
+
+NaN = float('nan')
+
+
+def create_tables(conn):
+    conn.execute(CREATE_ASTEROIDS)
+    conn.execute(CREATE_CLOSE_APPROACH)
+    conn.commit()
+
+
+def _to_float(value):
+    return float(value) if value else None
+
+
+def parse_neo(ast):
+    """Flatten one feed object into a record tuple in FIELDS order."""
+    # Same defaulting as the notebook: missing approach data -> None columns
+    approach_date = None
+    relative_velocity_kmph = None
+    astronomical_distance = None
+    miss_distance_km = None
+    miss_distance_lunar = None
+    orbiting_body = None
+
+    close_approach_data = ast.get('close_approach_data')
+    if close_approach_data:
+        first_approach = close_approach_data[0]
+        miss_distance = first_approach.get('miss_distance', {})
+        approach_date = first_approach.get('close_approach_date')
+        relative_velocity_kmph = first_approach.get('relative_velocity', {}).get('kilometers_per_hour')
+        astronomical_distance = miss_distance.get('astronomical')
+        miss_distance_km = miss_distance.get('kilometers')
+        miss_distance_lunar = miss_distance.get('lunar')
+        orbiting_body = first_approach.get('orbiting_body')
+
+    diameter = ast['estimated_diameter']['kilometers']
+    return (
+        int(ast['id']),
+        int(ast['neo_reference_id']),
+        ast['name'],
+        ast['absolute_magnitude_h'],
+        diameter['estimated_diameter_min'],
+        diameter['estimated_diameter_max'],
+        bool(ast['is_potentially_hazardous_asteroid']),
+        approach_date,
+        _to_float(relative_velocity_kmph),
+        _to_float(astronomical_distance),
+        _to_float(miss_distance_km),
+        _to_float(miss_distance_lunar),
+        orbiting_body,
+    )
+
+
+def parse_feed_page(data):
+    """Yield record tuples for every object in one feed response."""
+    details = data.get('near_earth_objects') or {}
+    for asteroids_on_date in details.values():
+        for ast in asteroids_on_date:
+            yield parse_neo(ast)
+
+
+def fetch_feed(start_date, end_date, api_key=API_KEY, session=None, cache=None):
+    """Yield feed pages (parsed JSON) starting at a date window, following links.next.
+
+    When ``cache`` (a ``neo_cache.ResponseCache``) is given, pages are served
+    from / saved to the local response store.
+    """
+    session = session or requests.Session()
+    url = FEED_URL.format(start_date=start_date, end_date=end_date, api_key=api_key)
+    while url:
+        print(f"Fetching data from: {url}")
+        if cache is not None:
+            data = cache.get(url, session)
+        else:
+            response = session.get(url, timeout=30)
+            response.raise_for_status()
+            data = response.json()
+        if not data.get('near_earth_objects'):
+            break
+        yield data
+        url = data.get('links', {}).get('next')
+
+
+class RecordBuffer:
+    """Columnar, typed-array buffer for parsed feed records.
+
+    Numeric columns live in ``array.array`` (8 bytes per value, NaN for
+    missing), the hazard flag in a byte array, and names/orbiting bodies/dates
+    are interned so repeated strings share one object. ``flush`` writes the
+    buffered rows to both tables in one transaction and empties the buffer.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.ids = array('q')
+        self.neo_reference_ids = array('q')
+        self.names = []
+        self.absolute_magnitude_h = array('d')
+        self.estimated_diameter_min_km = array('d')
+        self.estimated_diameter_max_km = array('d')
+        self.is_hazardous = array('b')
+        self.close_approach_dates = []
+        self.relative_velocity_kmph = array('d')
+        self.astronomical = array('d')
+        self.miss_distance_km = array('d')
+        self.miss_distance_lunar = array('d')
+        self.orbiting_bodies = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append(self, record):
+        (id_, neo_reference_id, name, magnitude, diameter_min, diameter_max, hazardous,
+         approach_date, velocity, astronomical, miss_km, miss_lunar, orbiting_body) = record
+        self.ids.append(id_)
+        self.neo_reference_ids.append(neo_reference_id)
+        self.names.append(sys.intern(name))
+        self.absolute_magnitude_h.append(NaN if magnitude is None else magnitude)
+        self.estimated_diameter_min_km.append(NaN if diameter_min is None else diameter_min)
+        self.estimated_diameter_max_km.append(NaN if diameter_max is None else diameter_max)
+        self.is_hazardous.append(1 if hazardous else 0)
+        self.close_approach_dates.append(sys.intern(approach_date) if approach_date else None)
+        self.relative_velocity_kmph.append(NaN if velocity is None else velocity)
+        self.astronomical.append(NaN if astronomical is None else astronomical)
+        self.miss_distance_km.append(NaN if miss_km is None else miss_km)
+        self.miss_distance_lunar.append(NaN if miss_lunar is None else miss_lunar)
+        self.orbiting_bodies.append(sys.intern(orbiting_body) if orbiting_body else None)
+
+    def record(self, i):
+        """Row ``i`` as a record tuple in FIELDS order (None for missing values)."""
+        return (self.ids[i], self.neo_reference_ids[i], self.names[i], _none(self.absolute_magnitude_h[i]),
+                _none(self.estimated_diameter_min_km[i]), _none(self.estimated_diameter_max_km[i]),
+                self.is_hazardous[i], self.close_approach_dates[i], _none(self.relative_velocity_kmph[i]),
+                _none(self.astronomical[i]), _none(self.miss_distance_km[i]), _none(self.miss_distance_lunar[i]),
+                self.orbiting_bodies[i])
+
+    def asteroid_rows(self, rows=None):
+        for i in range(len(self)) if rows is None else rows:
+            yield (self.ids[i], self.names[i], _none(self.absolute_magnitude_h[i]),
+                   _none(self.estimated_diameter_min_km[i]), _none(self.estimated_diameter_max_km[i]),
+                   self.is_hazardous[i])
+
+    def close_approach_rows(self, rows=None):
+        for i in range(len(self)) if rows is None else rows:
+            yield (self.neo_reference_ids[i], self.close_approach_dates[i],
+                   _none(self.relative_velocity_kmph[i]), _none(self.astronomical[i]),
+                   _none(self.miss_distance_km[i]), _none(self.miss_distance_lunar[i]),
+                   self.orbiting_bodies[i])
+
+    def flush(self, conn, sketches=None, validator=None, changes=None):
+        """Insert buffered rows into asteroids/close_approach and clear. Returns rows inserted.
+
+        When ``validator`` (a ``neo_validate.Validator``) is given, rows that
+        fail its checks go to the quarantine table instead. When ``changes``
+        (a ``neo_changes.ChangeTracker``) is given, rows already present are
+        updated in place or skipped and every change is logged; only new rows
+        are inserted. When ``sketches`` (a ``neo_sketches.SketchSet``) is given
+        it is updated with the inserted rows (a sync's updates and deletes
+        reach it in ``ChangeTracker.finish``). Everything happens in one
+        transaction.
+        """
+        n = len(self)
+        if n:
+            rows = None
+            if validator is not None:
+                keep, reasons, report = validator.check(self)
+                rows = keep.nonzero()[0].tolist()
+                n = len(rows)
+            with conn:
+                if changes is not None:
+                    rows = changes.apply(conn, self, rows)
+                    n = len(rows)
+                conn.executemany(INSERT_ASTEROID, self.asteroid_rows(rows))
+                conn.executemany(INSERT_CLOSE_APPROACH, self.close_approach_rows(rows))
+                if validator is not None:
+                    validator.quarantine(conn, self, keep, reasons, report)
+                if sketches is not None:
+                    sketches.update(self, rows)
+                    sketches.save(conn)
+            self.clear()
+        return n
+
+    def nbytes(self):
+        """Approximate memory held by the buffer (arrays + list slots; interned strings excluded)."""
+        total = 0
+        for value in vars(self).values():
+            total += sys.getsizeof(value)
+        return total
+
+
+def _none(value):
+    # NaN is the only float not equal to itself
+    return None if value != value else value
+
+
+def load_records(records, conn, chunk_size=5000, buffer=None, sketches=None, validator=None, changes=None):
+    """Stream record tuples into the database, flushing every ``chunk_size`` rows."""
+    buffer = buffer if buffer is not None else RecordBuffer()
+    written = 0
+    for record in records:
+        buffer.append(record)
+        if len(buffer) >= chunk_size:
+            written += buffer.flush(conn, sketches, validator, changes)
+    written += buffer.flush(conn, sketches, validator, changes)
+    return written
+
+
+def ingest(start_date="2024-01-01", end_date="2024-01-07", target=10000,
+           db_path=DB_PATH, chunk_size=5000, pages=None, validate=True, track_changes=True):
+    """Fetch feed pages (or use ``pages``) and sync up to ``target`` records into ``db_path``.
+
+    With ``track_changes`` the load is recorded as a sync in ``change_log``
+    (see neo_changes.py); records already in the database are compared by
+    hash and updated rather than inserted again.
+    """
+    conn = sqlite3.connect(db_path)
+    create_tables(conn)
+    pages = pages if pages is not None else fetch_feed(start_date, end_date)
+    changes = None
+
+    def records():
+        count = 0
+        for page in pages:
+            dates = sorted(page.get('near_earth_objects') or {})
+            for record in parse_feed_page(page):
+                yield record
+                count += 1
+                if count >= target:
+                    return
+            # Every record of this page's date window was loaded, so deletions there can be inferred
+            if changes is not None and dates:
+                changes.loaded_window(dates[0], dates[-1])
+
+    try:
+        sketches = neo_sketches.load_or_build(conn)
+        changes = neo_changes.ChangeTracker(conn, start_date, end_date) if track_changes else None
+        validator = neo_validate.Validator(conn, check_existing=changes is None) if validate else None
+        written = load_records(records(), conn, chunk_size=chunk_size, sketches=sketches,
+                               validator=validator, changes=changes)
+        if changes is not None:
+            changes.finish(conn, sketches=sketches)
+    finally:
+        conn.close()
+    print(f"\nCollected {written} asteroids (target was {target}).")
+    for report in validator.reports if validate else []:
+        print(neo_validate.format_report(report))
+    if changes is not None:
+        print(neo_changes.format_sync(changes))
+    neo_snapshot.build_snapshot(db_path)
+    return written
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _synthetic_records(n):
+    bodies = ('Earth', 'Mars', 'Venus', 'Merc')
+    for i in range(n):
+        yield (2000000 + i, 2000000 + i, f"({2000 + i % 25} AB{i})", 18.0 + (i % 100) / 10,
+               0.01 * (i % 50 + 1), 0.02 * (i % 50 + 1), i % 7 == 0, f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+               20000.0 + i % 90000, 0.01 * (i % 100 + 1), 1495978.707 * (i % 100 + 1),
+               1495978.707 * (i % 100 + 1) / 384570.35989717, bodies[i % 4])
+
+
+def _measure_memory(approach, n, traced):
+    # Runs in a fresh process, so ru_maxrss is this approach's own peak. tracemalloc's
+    # bookkeeping costs RSS itself, so traced and RSS runs are separate processes.
+    baseline = peak_rss_mb()
+    if traced:
+        tracemalloc.start()
+    if approach == 'dict_list':
+        rows = [dict(zip(('s.no',) + FIELDS, (i + 1,) + record))
+                for i, record in enumerate(_synthetic_records(n))]
+    else:
+        rows = RecordBuffer()
+        for record in _synthetic_records(n):
+            rows.append(record)
+    if traced:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    return peak_rss_mb() - baseline
+
+
+def memory_report(n=1000000):
+    """Compare the notebook's list-of-dicts against RecordBuffer for ``n`` rows.
+
+    Each approach is built in its own spawned process (once under tracemalloc,
+    once for RSS), so one approach's peak never includes the other's.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for approach in ('dict_list', 'record_buffer'):
+        results[approach] = {}
+        for traced in (True, False):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results[approach]['traced' if traced else 'rss'] = pool.submit(
+                    _measure_memory, approach, n, traced).result()
+
+    print(f"Rows: {n:,}")
+    for label, r in results.items():
+        rss_bytes = r['rss'] * 1024 * 1024
+        print(f"{label:>14}: {r['traced'] / 1e6:8.1f} MB traced ({r['traced'] / n:6.1f} bytes/row), "
+              f"peak RSS +{rss_bytes / 1e6:.1f} MB over imports ({rss_bytes / n:6.1f} bytes/row)")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load NASA NeoWs feed data into Asteroid_Data.db")
+    parser.add_argument("--start-date", default="2024-01-01")
+    parser.add_argument("--end-date", default="2024-01-07")
+    parser.add_argument("--target", type=int, default=10000)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--no-validate", action="store_true", help="skip the validation/quarantine stage")
+    parser.add_argument("--no-changes", action="store_true", help="plain append, without the change log")
+    parser.add_argument("--memory-report", type=int, metavar="ROWS",
+                        help="compare dict-list vs columnar buffer memory for ROWS synthetic rows and exit")
+    args = parser.parse_args()
+
+    if args.memory_report:
+        memory_report(args.memory_report)
+    else:
+        ingest(args.start_date, args.end_date, args.target, args.db, args.chunk_size,
+               validate=not args.no_validate, track_changes=not args.no_changes)
+        print(f"Peak RSS: {peak_rss_mb():.1f} MB")
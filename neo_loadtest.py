@@ -0,0 +1,340 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import resource
+import threading
+import statistics
+import multiprocessing
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+# Interaction traces: an app plus the steps one user performs after the page loads.
+# ("click", key) presses a button; (kind, label, value) sets a widget found by its label.
+TRACES = {
+    "improvised-queries": ("Improvised_nasa_project.py", [
+        ("click", "btn_3. Top 10 fastest asteroids"),
+        ("click", "btn_9. Closest approach date & distance"),
+        ("click", "btn_11. Approaches per month"),
+        ("click", "btn_7. Sort by max estimated diameter"),
+        ("click", "btn_Bonus 3: Top 5 closest approaches"),
+    ]),
+    "improvised-filters": ("Improvised_nasa_project.py", [
+        ("slider", "Maximum Relative Velocity (km/h)", 80000.0),
+        ("slider", "Minimum Relative Velocity (km/h)", 20000.0),
+        ("slider", "Maximum AU", 0.2),
+        ("slider", "Maximum LD", 50.0),
+        ("selectbox", "Potentially Hazardous?", "Yes"),
+    ]),
+    "modified-sections": ("Modified_nasa_project.py", [
+        ("radio", "Select Section:", "CRUD Operations"),
+        ("selectbox", "Select Table", "View Close Approaches"),
+        ("radio", "Select Section:", "Filters"),
+        ("slider", "Velocity (kmph)", (20000.0, 80000.0)),
+        ("radio", "Select Section:", "📊 Queries"),
+        ("selectbox", "Select a Query", "11. Approaches per month"),
+    ]),
+}
+
+SESSION_KEY = "_loadtest_session"
+
+
+def step_name(step):
+    if step[0] == "click":
+        return f"click {step[1].removeprefix('btn_')}"
+    return f"{step[1]} = {step[2]}"
+
+
+def current_rss_mb():
+    """Resident set size of this process now (Linux), else the peak."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+class QueryCounter:
+    """Counts SQL statements per simulated session.
+
+    Every ``sqlite3.connect`` made while installed gets a trace callback; the
+    statement is attributed to the session whose script run executes it
+    (identified through its session state). DuckDB backend queries are
+    counted by wrapping ``neo_backend.DuckDBBackend.query``.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._originals = []
+
+    def _session(self):
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx()
+        if ctx is None or SESSION_KEY not in ctx.session_state:
+            return None
+        return ctx.session_state[SESSION_KEY]
+
+    def _count(self, _statement=None):
+        session = self._session()
+        with self._lock:
+            self.counts[session] += 1
+
+    def install(self):
+        real_connect = sqlite3.connect
+
+        def connect(*args, **kwargs):
+            conn = real_connect(*args, **kwargs)
+            conn.set_trace_callback(self._count)
+            return conn
+
+        sqlite3.connect = connect
+        self._originals.append((sqlite3, "connect", real_connect))
+        try:
+            import neo_backend
+        except ImportError:
+            return
+        real_query = neo_backend.DuckDBBackend.query
+
+        def query(backend, sql, params=()):
+            self._count()
+            return real_query(backend, sql, params)
+
+        neo_backend.DuckDBBackend.query = query
+        self._originals.append((neo_backend.DuckDBBackend, "query", real_query))
+
+    def uninstall(self):
+        for owner, name, original in reversed(self._originals):
+            setattr(owner, name, original)
+        self._originals.clear()
+
+    def take(self, session):
+        with self._lock:
+            return self.counts.pop(session, 0)
+
+
+def _apply(at, step):
+    if step[0] == "click":
+        at.button(key=step[1]).click()
+        return
+    kind, label, value = step
+    widgets = [w for w in getattr(at, kind) if w.label == label]
+    if not widgets:
+        raise LookupError(f"No {kind} labelled {label!r} on the page")
+    widgets[0].set_value(value)
+
+
+def run_session(session_id, trace, loops, counter, think_time=0.0, timeout=120):
+    """One simulated user: load the app, replay the trace ``loops`` times; returns per-rerun samples."""
+    from streamlit.testing.v1 import AppTest
+
+    app, steps = TRACES[trace]
+    at = AppTest.from_file(app, default_timeout=timeout)
+    at.session_state[SESSION_KEY] = session_id
+    samples = []
+
+    def rerun(name):
+        started = time.perf_counter()
+        error = None
+        try:
+            at.run()
+            if at.exception:
+                error = at.exception[0].message
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        samples.append({"session": session_id, "trace": trace, "step": name,
+                        "ms": (time.perf_counter() - started) * 1000,
+                        "queries": counter.take(session_id), "error": error})
+
+    rerun("load")
+    for _ in range(loops):
+        for step in steps:
+            if think_time:
+                time.sleep(think_time)
+            try:
+                _apply(at, step)
+            except Exception as e:
+                samples.append({"session": session_id, "trace": trace, "step": step_name(step), "ms": 0.0,
+                                "queries": 0, "error": f"{type(e).__name__}: {e}"})
+                continue
+            rerun(step_name(step))
+    # Keep the AppTest alive until the run ends so its session state counts towards memory
+    return samples, at
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values):
+    return {"p50": _percentile(values, 50), "p90": _percentile(values, 90), "p95": _percentile(values, 95),
+            "p99": _percentile(values, 99), "max": max(values, default=0.0),
+            "mean": statistics.fmean(values) if values else 0.0}
+
+
+def _session_process(session_id, trace, loops, think_time, timeout, start):
+    """Worker process: warm up, wait for every session at ``start``, then run one session."""
+    import logging
+
+    # AppTest logs per rerun outside a server (and app errors are in the report); keep output readable
+    logging.getLogger("streamlit").setLevel(logging.CRITICAL)
+    counter = QueryCounter()
+    counter.install()
+    try:
+        # Imports and caches are per process; a server would have them warm already
+        run_session("warmup", trace, 0, counter, timeout=timeout)
+        counter.counts.clear()
+        baseline = current_rss_mb()
+        peak = [baseline]
+        sampling = threading.Event()
+
+        def sample_rss():
+            while not sampling.wait(0.05):
+                peak[0] = max(peak[0], current_rss_mb())
+
+        sampler = threading.Thread(target=sample_rss, daemon=True)
+        sampler.start()
+        start.wait(timeout)
+        started = time.time()
+        samples, at = run_session(session_id, trace, loops, counter, think_time, timeout)
+        finished = time.time()
+        sampling.set()
+        sampler.join()
+        # Measured while the AppTest is alive, so its session state counts towards memory
+        end_rss = current_rss_mb()
+        del at
+    finally:
+        counter.uninstall()
+    return samples, {"started": started, "finished": finished, "baseline_rss": baseline,
+                     "peak_rss": max(peak[0], end_rss), "end_rss": end_rss}
+
+
+def load_test(traces=("improvised-queries",), sessions=8, loops=1, think_time=0.0, timeout=120):
+    """Run ``sessions`` concurrent simulated users (round-robin over ``traces``), one process each.
+
+    AppTest installs a process-global mock Runtime for each script run, so
+    sessions cannot share an interpreter; separate processes also let their
+    reruns contend for CPU, the database files and the engines' own locks
+    as threads do on a real server (SQLite and DuckDB release the GIL while
+    querying). Every session starts at once after a warm-up run in its
+    process; memory figures are per session process.
+    """
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager, ProcessPoolExecutor(max_workers=sessions, mp_context=context) as pool:
+        start = manager.Barrier(sessions)
+        futures = [pool.submit(_session_process, i, traces[i % len(traces)], loops, think_time, timeout, start)
+                   for i in range(sessions)]
+        outcomes = [f.result() for f in futures]
+    wall = max(stats["finished"] for _, stats in outcomes) - min(stats["started"] for _, stats in outcomes)
+    baseline = statistics.fmean(stats["baseline_rss"] for _, stats in outcomes)
+    end_rss = statistics.fmean(stats["end_rss"] for _, stats in outcomes)
+
+    samples = [s for session_samples, _ in outcomes for s in session_samples]
+    reruns = [s for s in samples if s["ms"] > 0]
+    by_step = defaultdict(list)
+    for s in reruns:
+        by_step[f"{s['trace']}: {s['step']}"].append(s)
+
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "traces": list(traces),
+        "sessions": sessions,
+        "loops": loops,
+        "think_time_s": think_time,
+        "env": {name: os.environ.get(name) for name in ("NEO_BACKEND", "NEO_USE_SNAPSHOT")},
+        "cpus": os.cpu_count(),
+        "reruns": len(reruns),
+        "errors": sum(1 for s in samples if s["error"]),
+        "error_examples": sorted({s["error"] for s in samples if s["error"]})[:5],
+        "wall_s": wall,
+        "reruns_per_s": len(reruns) / wall if wall else 0.0,
+        "latency_ms": summarize([s["ms"] for s in reruns]),
+        "queries": {"total": sum(s["queries"] for s in reruns),
+                    "per_rerun": statistics.fmean(s["queries"] for s in reruns) if reruns else 0.0},
+        "memory_mb": {"baseline_rss": baseline, "peak_rss": max(stats["peak_rss"] for _, stats in outcomes),
+                      "end_rss": end_rss, "per_session": end_rss - baseline},
+        "steps": {name: {"n": len(items), "queries": statistics.fmean(s["queries"] for s in items),
+                         **summarize([s["ms"] for s in items])} for name, items in sorted(by_step.items())},
+    }
+
+
+def format_report(report):
+    lat, mem, q = report["latency_ms"], report["memory_mb"], report["queries"]
+    lines = [
+        f"{report['sessions']} sessions x {report['loops']} loop(s) of {', '.join(report['traces'])} "
+        f"(env {report['env']}, {report['cpus']} CPU)",
+        f"reruns {report['reruns']:,} in {report['wall_s']:.1f}s ({report['reruns_per_s']:.1f}/s), "
+        f"errors {report['errors']}",
+        f"rerun latency ms: p50 {lat['p50']:.0f}  p90 {lat['p90']:.0f}  p95 {lat['p95']:.0f}  "
+        f"p99 {lat['p99']:.0f}  max {lat['max']:.0f}",
+        f"DB queries: {q['total']:,} total, {q['per_rerun']:.1f} per rerun",
+        f"memory MB per session process: baseline {mem['baseline_rss']:.0f}, peak {mem['peak_rss']:.0f}, "
+        f"{mem['per_session']:.1f} added by the session",
+        f"{'step':<60}{'n':>5}{'p50':>8}{'p95':>8}{'queries':>9}",
+    ]
+    for name, s in report["steps"].items():
+        lines.append(f"{name[:59]:<60}{s['n']:>5}{s['p50']:>8.0f}{s['p95']:>8.0f}{s['queries']:>9.1f}")
+    for error in report["error_examples"]:
+        lines.append(f"error: {error[:120]}")
+    return "\n".join(lines)
+
+
+# Metrics shown by --compare: (label, path into the report, lower is better)
+COMPARED = [
+    ("rerun p50 ms", ("latency_ms", "p50"), True),
+    ("rerun p95 ms", ("latency_ms", "p95"), True),
+    ("rerun p99 ms", ("latency_ms", "p99"), True),
+    ("reruns/s", ("reruns_per_s",), False),
+    ("queries/rerun", ("queries", "per_rerun"), True),
+    ("MB/session", ("memory_mb", "per_session"), True),
+    ("peak RSS MB", ("memory_mb", "peak_rss"), True),
+    ("errors", ("errors",), True),
+]
+
+
+def compare(before, after):
+    """Side-by-side table of two saved reports."""
+    if (before["traces"], before["sessions"], before["loops"]) != (after["traces"], after["sessions"], after["loops"]):
+        print("warning: reports used different traces/sessions/loops")
+    lines = [f"{'metric':<16}{'before':>12}{'after':>12}{'change':>10}"]
+    for label, path, lower_is_better in COMPARED:
+        a, b = before, after
+        for key in path:
+            a, b = a[key], b[key]
+        change = (b - a) / a * 100 if a else 0.0
+        better = (change < 0) == lower_is_better if change else None
+        mark = "" if better is None else " better" if better else " worse"
+        lines.append(f"{label:<16}{a:>12.1f}{b:>12.1f}{change:>+9.1f}%{mark}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay interaction traces against the dashboards with N sessions")
+    parser.add_argument("--trace", action="append", choices=sorted(TRACES),
+                        help="trace to replay (repeat to mix; sessions are assigned round-robin)")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--loops", type=int, default=1, help="times each session replays its trace")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds between a user's interactions")
+    parser.add_argument("--output", "-o", help="write the JSON report here")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two saved reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f, open(args.compare[1]) as g:
+            print(compare(json.load(f), json.load(g)))
+    else:
+        report = load_test(tuple(args.trace or ["improvised-queries"]), args.sessions, args.loops, args.think_time)
+        print(format_report(report))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Wrote {args.output}")
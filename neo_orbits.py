@@ -0,0 +1,286 @@
+import os
+import time
+import sqlite3
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import neo_snapshot
+from neo_validate import AU_KM, NEOWS_LD_KM
+
+DB_PATH = "Asteroid_Data.db"
+
+# Gaussian gravitational constant -> GM_sun in AU^3/day^2
+GM_SUN = 0.01720209895 ** 2
+# Same AU and lunar distance as NeoWs, so LD thresholds mean the same on forecast_approach
+# and close_approach
+LD_AU = NEOWS_LD_KM / AU_KM
+JD_UNIX_EPOCH = 2440587.5
+
+# Earth-Moon barycentre mean elements at J2000 (JPL approximate ephemeris, rates ignored);
+# the barycentre sits ~4,700 km (0.012 LD) from Earth's centre
+EARTH_ELEMENTS = {
+    "epoch_jd": 2451545.0, "a_au": 1.00000261, "e": 0.01671123, "i_deg": -0.00001531,
+    "node_deg": 0.0, "peri_deg": 102.93768193, "ma_deg": 100.46457166 - 102.93768193,
+}
+
+CREATE_ORBITAL_ELEMENTS = '''
+CREATE TABLE IF NOT EXISTS orbital_elements (
+    id INTEGER PRIMARY KEY,
+    epoch_jd REAL,
+    a_au REAL,
+    e REAL,
+    i_deg REAL,
+    node_deg REAL,
+    peri_deg REAL,
+    ma_deg REAL,
+    orbit_class TEXT
+)
+'''
+
+CREATE_FORECAST = '''
+CREATE TABLE IF NOT EXISTS forecast_approach (
+    id INTEGER,
+    approach_date TEXT,
+    approach_jd REAL,
+    miss_distance_au REAL,
+    miss_distance_lunar REAL,
+    relative_velocity_kmph REAL,
+    computed_at TEXT
+)
+'''
+
+ELEMENT_COLUMNS = ("epoch_jd", "a_au", "e", "i_deg", "node_deg", "peri_deg", "ma_deg")
+
+
+def parse_orbital_data(neo):
+    """Orbital element row from a ``neo/{id}`` lookup response, or None if it has no usable orbit."""
+    orbit = neo.get("orbital_data") or {}
+    try:
+        return (
+            int(neo["id"]),
+            float(orbit["epoch_osculation"]),
+            float(orbit["semi_major_axis"]),
+            float(orbit["eccentricity"]),
+            float(orbit["inclination"]),
+            float(orbit["ascending_node_longitude"]),
+            float(orbit["perihelion_argument"]),
+            float(orbit["mean_anomaly"]),
+            (orbit.get("orbit_class") or {}).get("orbit_class_type"),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def store_elements(conn, rows):
+    """Upsert orbital element rows (filled by neo_enrich.py from the lookup responses)."""
+    conn.execute(CREATE_ORBITAL_ELEMENTS)
+    conn.executemany("INSERT OR REPLACE INTO orbital_elements VALUES (?,?,?,?,?,?,?,?,?)", rows)
+
+
+def load_elements(conn, ids=None):
+    """Elliptic orbits as (ids array, dict of float arrays keyed by ELEMENT_COLUMNS)."""
+    rows = conn.execute(f"SELECT id, {', '.join(ELEMENT_COLUMNS)} FROM orbital_elements WHERE e < 1").fetchall()
+    if ids is not None:
+        wanted = set(ids)
+        rows = [r for r in rows if r[0] in wanted]
+    table = np.array([r[1:] for r in rows], dtype=float).reshape(-1, len(ELEMENT_COLUMNS))
+    return np.array([r[0] for r in rows], dtype=np.int64), {c: table[:, k] for k, c in enumerate(ELEMENT_COLUMNS)}
+
+
+def jd_from_date(value):
+    return datetime.fromisoformat(str(value)).replace(tzinfo=timezone.utc).timestamp() / 86400 + JD_UNIX_EPOCH
+
+
+def date_from_jd(jd):
+    return (datetime(1970, 1, 1) + timedelta(days=float(jd) - JD_UNIX_EPOCH)).strftime("%Y-%m-%d")
+
+
+def state_vectors(el, jd):
+    """Heliocentric ecliptic position (AU) and velocity (AU/day) from Keplerian elements.
+
+    ``el`` values are arrays of shape (N,) and ``jd`` broadcasts against
+    (N, 1), so one call propagates every object over a whole time grid.
+    Returns arrays of shape (3, N, T).
+    """
+    a = el["a_au"][:, None]
+    e = el["e"][:, None]
+    inc, node, peri = (np.radians(el[c])[:, None] for c in ("i_deg", "node_deg", "peri_deg"))
+    n = np.sqrt(GM_SUN / a ** 3)
+    M = np.radians(el["ma_deg"])[:, None] + n * (np.asarray(jd) - el["epoch_jd"][:, None])
+    M = np.remainder(M, 2 * np.pi)
+
+    # Kepler's equation by Newton iteration (fixed count keeps it fully vectorized)
+    E = np.where(e < 0.8, M + e * np.sin(M), np.pi)
+    for _ in range(10):
+        E = E - (E - e * np.sin(E) - M) / (1 - e * np.cos(E))
+
+    cos_E, sin_E = np.cos(E), np.sin(E)
+    root = np.sqrt(1 - e * e)
+    x, y = a * (cos_E - e), a * root * sin_E
+    rate = a * n / (1 - e * cos_E)
+    vx, vy = -rate * sin_E, rate * root * cos_E
+
+    cw, sw, cn, sn, ci, si = np.cos(peri), np.sin(peri), np.cos(node), np.sin(node), np.cos(inc), np.sin(inc)
+    P = (cw * cn - sw * ci * sn, cw * sn + sw * ci * cn, sw * si)
+    Q = (-sw * cn - cw * ci * sn, -sw * sn + cw * ci * cn, cw * si)
+    position = np.stack([x * p + y * q for p, q in zip(P, Q)])
+    velocity = np.stack([vx * p + vy * q for p, q in zip(P, Q)])
+    return position, velocity
+
+
+def _earth():
+    return {k: np.array([v]) for k, v in EARTH_ELEMENTS.items()}
+
+
+def geocentric(el, jd):
+    """Position/velocity relative to Earth, shape (3, N, T)."""
+    pos, vel = state_vectors(el, jd)
+    earth_pos, earth_vel = state_vectors(_earth(), jd)
+    return pos - earth_pos, vel - earth_vel
+
+
+def _refine_minimum(sq_prev, sq_mid, sq_next, step):
+    # Parabola through three squared distances: offset of the vertex from the middle sample,
+    # and the distance there. Near a flyby d^2 = b^2 + v^2 t^2 is exactly a parabola, while
+    # d itself is a hyperbola whose fitted vertex comes out too far for fast, close passes
+    denom = sq_prev - 2 * sq_mid + sq_next
+    offset = np.where(denom > 0, 0.5 * (sq_prev - sq_next) / np.where(denom > 0, denom, 1), 0.0)
+    offset = np.clip(offset, -1, 1)
+    return offset * step, np.sqrt(np.maximum(sq_mid - 0.25 * (sq_prev - sq_next) * offset, 0.0))
+
+
+def _propagate_chunk(args):
+    """Worker: scan one chunk of objects over [start_jd, end_jd] and return close-approach candidates."""
+    ids, el, start_jd, end_jd, step, max_au, block = args
+    found = []
+    t0 = start_jd
+    while t0 < end_jd:
+        # One extra sample on each side so minima on block edges are still detected
+        times = t0 + step * np.arange(-1, block + 1)
+        rel, _ = geocentric(el, times)
+        sq = (rel ** 2).sum(axis=0)
+        mid = sq[:, 1:-1]
+        is_min = (mid < sq[:, :-2]) & (mid <= sq[:, 2:]) & (mid < (max_au * 1.5) ** 2)
+        rows, cols = np.nonzero(is_min)
+        if len(rows):
+            shift, refined = _refine_minimum(sq[rows, cols], sq[rows, cols + 1], sq[rows, cols + 2], step)
+            jd = times[cols + 1] + shift
+            keep = (refined < max_au) & (jd >= start_jd) & (jd < end_jd)
+            rows, jd, refined = rows[keep], jd[keep], refined[keep]
+            if len(rows):
+                sub = {k: v[rows] for k, v in el.items()}
+                _, rel_vel = geocentric(sub, jd[:, None])
+                speed = np.sqrt((rel_vel[:, :, 0] ** 2).sum(axis=0)) * AU_KM / 24
+                found.extend(zip(ids[rows].tolist(), jd.tolist(), refined.tolist(), speed.tolist()))
+        t0 += step * block
+    return found
+
+
+def forecast(db_path=DB_PATH, years=10, max_ld=10.0, step=0.5, start_date=None,
+             workers=None, chunk_size=500, block=512):
+    """Propagate all stored orbits and write candidate approaches within ``max_ld`` to forecast_approach."""
+    conn = sqlite3.connect(db_path)
+    ids, el = load_elements(conn)
+    if not len(ids):
+        conn.close()
+        print("No orbital elements stored; run `python neo_enrich.py` first.")
+        return []
+
+    start = datetime.fromisoformat(start_date) if start_date else datetime.now(timezone.utc).replace(tzinfo=None)
+    start_jd = jd_from_date(start.date().isoformat())
+    end_jd = start_jd + 365.25 * years
+    max_au = max_ld * LD_AU
+    chunks = [(ids[i:i + chunk_size], {k: v[i:i + chunk_size] for k, v in el.items()},
+               start_jd, end_jd, step, max_au, block)
+              for i in range(0, len(ids), chunk_size)]
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        found = [row for rows in pool.map(_propagate_chunk, chunks) for row in rows]
+    elapsed = time.perf_counter() - started
+
+    computed_at = datetime.now(timezone.utc).isoformat()
+    rows = [(id_, date_from_jd(jd), jd, au, au / LD_AU, kmph, computed_at) for id_, jd, au, kmph in found]
+    with conn:
+        conn.execute(CREATE_FORECAST)
+        conn.execute("DELETE FROM forecast_approach")
+        conn.executemany("INSERT INTO forecast_approach VALUES (?,?,?,?,?,?,?)", rows)
+    conn.close()
+    neo_snapshot.refresh_snapshot(db_path)
+
+    epochs = len(ids) * int(np.ceil((end_jd - start_jd) / step))
+    print(f"Propagated {len(ids):,} objects x {epochs // len(ids):,} epochs in {elapsed:.2f}s "
+          f"({epochs / elapsed:,.0f} object-epochs/s); {len(rows):,} approaches within {max_ld} LD")
+    return rows
+
+
+def validate(db_path=DB_PATH, window=10.0, step=0.05):
+    """Compare two-body predictions against the recorded Earth approaches in close_approach.
+
+    Each object is propagated over +/- ``window`` days around its recorded
+    date and the predicted minimum is compared with the recorded date and
+    miss distance. Two-body propagation ignores planetary perturbations, so
+    errors grow with distance from the element epoch and for very deep
+    encounters.
+    """
+    conn = sqlite3.connect(db_path)
+    recorded = conn.execute('''
+        SELECT ca.neo_reference_id, ca.close_approach_date, ca.astronomical
+        FROM close_approach ca
+        JOIN orbital_elements o ON o.id = ca.neo_reference_id
+        WHERE ca.orbiting_body = 'Earth' AND ca.close_approach_date IS NOT NULL AND o.e < 1
+    ''').fetchall()
+    ids, el = load_elements(conn)
+    conn.close()
+    if not recorded:
+        print("No recorded approaches with stored orbital elements to validate against.")
+        return None
+
+    index = {id_: k for k, id_ in enumerate(ids.tolist())}
+    rows = np.array([index[r[0]] for r in recorded])
+    sub = {k: v[rows] for k, v in el.items()}
+    centre = np.array([jd_from_date(r[1]) for r in recorded])
+    offsets = np.arange(-window, window + step / 2, step)
+    rel, _ = geocentric(sub, centre[:, None] + offsets)
+    dist = np.sqrt((rel ** 2).sum(axis=0))
+    best = dist.argmin(axis=1)
+    # Recorded dates are calendar days (TDB 00:00 - 24:00), so compare against the day's midpoint
+    date_error = np.abs(offsets[best] - 0.5)
+    actual = np.array([r[2] for r in recorded], dtype=float)
+    distance_error = np.abs(dist[np.arange(len(best)), best] - actual) / actual
+
+    report = {
+        "approaches": len(recorded),
+        "median_date_error_days": float(np.median(date_error)),
+        "within_1_day": float(np.mean(date_error <= 1.0)),
+        "median_distance_rel_error": float(np.median(distance_error)),
+        "within_10pct_distance": float(np.mean(distance_error <= 0.10)),
+    }
+    for key, value in report.items():
+        print(f"{key:>28}: {value:,.4g}")
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Forecast future close approaches by Keplerian propagation")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("forecast", help="propagate all objects and fill forecast_approach")
+    run.add_argument("--years", type=float, default=10)
+    run.add_argument("--max-ld", type=float, default=10.0)
+    run.add_argument("--step", type=float, default=0.5, help="time grid step in days")
+    run.add_argument("--start-date")
+    run.add_argument("--workers", type=int, default=os.cpu_count())
+
+    sub.add_parser("validate", help="check predictions against recorded approaches")
+
+    args = parser.parse_args()
+    if args.command == "forecast":
+        forecast(args.db, args.years, args.max_ld, args.step, args.start_date, args.workers)
+    else:
+        validate(args.db)
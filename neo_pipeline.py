@@ -0,0 +1,399 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+import itertools
+from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+import requests
+
+import neo_changes
+import neo_ingest
+import neo_sketches
+import neo_snapshot
+import neo_validate
+
+DB_PATH = neo_ingest.DB_PATH
+
+# How often the monitor samples queue depths (seconds)
+SAMPLE_INTERVAL = 0.05
+# Timeout for blocking queue calls, so workers notice a shutdown promptly
+POLL = 0.1
+
+
+def feed_windows(start_date, end_date):
+    """Endless (start, end) date windows of the same length, i.e. the pages links.next would walk."""
+    start = date.fromisoformat(start_date)
+    span = (date.fromisoformat(end_date) - start).days + 1
+    for k in itertools.count():
+        first = start + timedelta(days=k * span)
+        yield first.isoformat(), (first + timedelta(days=span - 1)).isoformat()
+
+
+def _parse_page(payload):
+    # Runs in a parser thread or a worker process: raw JSON (or an already decoded page) -> record tuples
+    data = json.loads(payload) if isinstance(payload, (bytes, str)) else payload
+    return list(neo_ingest.parse_feed_page(data))
+
+
+class StageMetrics:
+    """Counters for one pipeline stage, updated by its worker threads.
+
+    ``busy`` is time spent doing the stage's own work; ``waiting`` is time
+    blocked on the input queue (starved) or the output queue (backpressure).
+    """
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.rows = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, busy, rows=0, starved=0.0, blocked=0.0):
+        with self._lock:
+            self.items += 1
+            self.rows += rows
+            self.busy += busy
+            self.starved += starved
+            self.blocked += blocked
+
+    def utilization(self, wall):
+        return self.busy / (wall * self.workers) if wall else 0.0
+
+    def summary(self, wall):
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "rows": self.rows,
+            "busy_s": self.busy,
+            "starved_s": self.starved,
+            "blocked_s": self.blocked,
+            "utilization": self.utilization(wall),
+            "items_per_s": self.items / wall if wall else 0.0,
+            "rows_per_s": self.rows / wall if wall else 0.0,
+        }
+
+
+class QueueMonitor(threading.Thread):
+    """Samples the depth of each queue until stopped."""
+
+    def __init__(self, queues, interval=SAMPLE_INTERVAL):
+        super().__init__(name="queue-monitor", daemon=True)
+        self.queues = queues
+        self.interval = interval
+        self.samples = {name: [] for name in queues}
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            for name, q in self.queues.items():
+                self.samples[name].append(q.qsize())
+
+    def summary(self):
+        result = {}
+        for name, q in self.queues.items():
+            samples = self.samples[name] or [0]
+            result[name] = {
+                "capacity": q.maxsize,
+                "mean_depth": sum(samples) / len(samples),
+                "max_depth": max(samples),
+                "full_pct": 100.0 * sum(s >= q.maxsize for s in samples) / len(samples),
+            }
+        return result
+
+
+class Pipeline:
+    """Fetch -> parse -> write ingestion with overlapping stages.
+
+    Fetcher threads download feed windows into a bounded parse queue;
+    parser threads decode and flatten pages (optionally in a process pool)
+    into a bounded write queue; a single writer re-orders pages by window,
+    batches them through ``RecordBuffer.flush`` (validation, sketches,
+    change log) and stops at ``target`` records or the first empty page.
+    Full queues block the stage above them, and fetchers never run more
+    than ``fetchers + queue_size`` windows ahead of the last one loaded, so a
+    slow writer or a slow page throttles fetching instead of piling pages up
+    in memory. Any stage failing stops all the others and the error is
+    re-raised from ``run``.
+    """
+
+    def __init__(self, start_date="2024-01-01", end_date="2024-01-07", target=10000, db_path=DB_PATH,
+                 chunk_size=5000, fetchers=4, parsers=2, parse_processes=0, queue_size=8,
+                 validate=True, cache=None, api_key=neo_ingest.API_KEY, track_changes=True):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.target = target
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        self.fetchers = fetchers
+        self.parsers = parsers
+        self.parse_processes = parse_processes
+        self.validate = validate
+        self.cache = cache
+        self.api_key = api_key
+        self.track_changes = track_changes
+
+        self.parse_queue = queue.Queue(maxsize=queue_size)
+        self.write_queue = queue.Queue(maxsize=queue_size)
+        self.metrics = {
+            "fetch": StageMetrics("fetch", fetchers),
+            "parse": StageMetrics("parse", parsers),
+            "write": StageMetrics("write", 1),
+        }
+        self.monitor = QueueMonitor({"parse_queue": self.parse_queue, "write_queue": self.write_queue})
+        self.stop = threading.Event()
+        self.error = None
+        self.end_seq = None
+        self.validator = None
+        self.changes = None
+        self.exhausted = False
+        self._lock = threading.Lock()
+        self._windows = enumerate(feed_windows(start_date, end_date))
+        # Reorder window: enough for every fetcher to be busy and one queue's worth of pages
+        # waiting behind a slow window; the writer notifies as it loads windows in order
+        self.max_ahead = fetchers + queue_size
+        self.next_seq = 0
+        self._loaded = threading.Condition(self._lock)
+        self._window_dates = {}
+        self._pool = None
+
+    def _fail(self, error):
+        with self._lock:
+            if self.error is None:
+                self.error = error
+        self.stop.set()
+
+    def _put(self, q, item):
+        """Blocking put that gives up on shutdown; returns seconds spent blocked (None if abandoned)."""
+        started = time.perf_counter()
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=POLL)
+                return time.perf_counter() - started
+            except queue.Full:
+                pass
+        return None
+
+    def _get(self, q):
+        """Blocking get that gives up on shutdown; returns (item or None, seconds spent starved)."""
+        started = time.perf_counter()
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=POLL), time.perf_counter() - started
+            except queue.Empty:
+                pass
+        return None, time.perf_counter() - started
+
+    def _mark_end(self, seq):
+        with self._lock:
+            if self.end_seq is None or seq < self.end_seq:
+                self.end_seq = seq
+
+    def _ended(self, seq):
+        # Caller holds self._lock
+        return self.stop.is_set() or (self.end_seq is not None and seq >= self.end_seq)
+
+    def _fetch_worker(self):
+        session = requests.Session()
+        try:
+            while not self.stop.is_set():
+                with self._loaded:
+                    seq, (start, end) = next(self._windows)
+                    while seq >= self.next_seq + self.max_ahead and not self._ended(seq):
+                        self._loaded.wait(POLL)
+                    if self._ended(seq):
+                        return
+                    self._window_dates[seq] = (start, end)
+                url = neo_ingest.FEED_URL.format(start_date=start, end_date=end, api_key=self.api_key)
+                print(f"Fetching data from: {url}")
+                started = time.perf_counter()
+                if self.cache is not None:
+                    payload = self.cache.get(url, session)
+                else:
+                    response = session.get(url, timeout=30)
+                    response.raise_for_status()
+                    # Leave JSON decoding to the parse stage
+                    payload = response.content
+                busy = time.perf_counter() - started
+                blocked = self._put(self.parse_queue, (seq, payload))
+                if blocked is None:
+                    return
+                self.metrics["fetch"].add(busy, blocked=blocked)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            session.close()
+
+    def _parse_worker(self):
+        try:
+            while True:
+                item, starved = self._get(self.parse_queue)
+                if item is None:
+                    return
+                seq, payload = item
+                started = time.perf_counter()
+                if self._pool is not None:
+                    records = self._pool.submit(_parse_page, payload).result()
+                else:
+                    records = _parse_page(payload)
+                busy = time.perf_counter() - started
+                if not records:
+                    # Same stopping rule as fetch_feed: an empty page ends the feed
+                    self._mark_end(seq)
+                blocked = self._put(self.write_queue, (seq, records))
+                if blocked is None:
+                    return
+                self.metrics["parse"].add(busy, rows=len(records), starved=starved, blocked=blocked)
+        except Exception as e:
+            self._fail(e)
+
+    def _write(self, conn, sketches):
+        buffer = neo_ingest.RecordBuffer()
+        pending = {}
+        appended = written = 0
+        while True:
+            item, starved = self._get(self.write_queue)
+            if item is None:
+                break
+            seq, records = item
+            pending[seq] = records
+            started = time.perf_counter()
+            rows = 0
+            # Pages finish out of order; load them in window order so results match ingest()
+            while self.next_seq in pending and appended < self.target:
+                page = pending.pop(self.next_seq)
+                # Same rule as ingest(): deletions are inferred only for windows loaded in full
+                loaded_in_full = 0 < len(page) <= self.target - appended
+                for record in page[:self.target - appended]:
+                    buffer.append(record)
+                    if len(buffer) >= self.chunk_size:
+                        written += buffer.flush(conn, sketches, self.validator, self.changes)
+                    appended += 1
+                    rows += 1
+                with self._loaded:
+                    window = self._window_dates.pop(self.next_seq)
+                    self.next_seq += 1
+                    self._loaded.notify_all()
+                if loaded_in_full and self.changes is not None:
+                    self.changes.loaded_window(*window)
+            self.exhausted = self.end_seq is not None and self.next_seq >= self.end_seq and appended < self.target
+            done = appended >= self.target or self.exhausted
+            if appended >= self.target:
+                # No window past the one that reached the target is needed
+                self._mark_end(self.next_seq)
+            if done:
+                written += buffer.flush(conn, sketches, self.validator, self.changes)
+            self.metrics["write"].add(time.perf_counter() - started, rows=rows, starved=starved)
+            if done:
+                break
+        return written
+
+    def run(self):
+        """Run the pipeline to completion; returns (rows written, wall seconds)."""
+        conn = sqlite3.connect(self.db_path)
+        neo_ingest.create_tables(conn)
+        sketches = neo_sketches.load_or_build(conn)
+        if self.track_changes:
+            self.changes = neo_changes.ChangeTracker(conn, self.start_date, self.end_date)
+        self.validator = neo_validate.Validator(conn, check_existing=self.changes is None) if self.validate else None
+        if self.parse_processes:
+            self._pool = ProcessPoolExecutor(max_workers=self.parse_processes)
+
+        threads = [threading.Thread(target=self._fetch_worker, name=f"fetch-{i}", daemon=True)
+                   for i in range(self.fetchers)]
+        threads += [threading.Thread(target=self._parse_worker, name=f"parse-{i}", daemon=True)
+                    for i in range(self.parsers)]
+        started = time.perf_counter()
+        self.monitor.start()
+        for thread in threads:
+            thread.start()
+
+        written = 0
+        try:
+            written = self._write(conn, sketches)
+            if self.changes is not None and self.error is None:
+                self.changes.finish(conn, sketches=sketches)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            # Done or failed: unblock every stage, then wait for in-flight work to drain
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+            self.monitor.stopped.set()
+            self.monitor.join()
+            conn.close()
+        self.wall = time.perf_counter() - started
+
+        if self.error is not None:
+            raise self.error
+        return written, self.wall
+
+    def report(self):
+        wall = self.wall
+        lines = [f"{'stage':<8}{'workers':>8}{'items':>8}{'rows':>10}{'busy s':>9}{'starved s':>11}"
+                 f"{'blocked s':>11}{'util':>7}{'rows/s':>11}"]
+        for name, stage in self.metrics.items():
+            s = stage.summary(wall)
+            lines.append(f"{name:<8}{s['workers']:>8}{s['items']:>8}{s['rows']:>10,}{s['busy_s']:>9.2f}"
+                         f"{s['starved_s']:>11.2f}{s['blocked_s']:>11.2f}{s['utilization']:>7.0%}"
+                         f"{s['rows_per_s']:>11,.0f}")
+        lines.append(f"{'queue':<13}{'capacity':>9}{'mean depth':>12}{'max':>6}{'full':>8}")
+        for name, q in self.monitor.summary().items():
+            lines.append(f"{name:<13}{q['capacity']:>9}{q['mean_depth']:>12.1f}{q['max_depth']:>6}"
+                         f"{q['full_pct']:>7.0f}%")
+        limiting = max(self.metrics.values(), key=lambda stage: stage.utilization(wall))
+        lines.append(f"Limiting stage: {limiting.name} ({limiting.utilization(wall):.0%} busy per worker)")
+        return "\n".join(lines)
+
+
+def ingest(start_date="2024-01-01", end_date="2024-01-07", target=10000, db_path=DB_PATH, chunk_size=5000,
+           fetchers=4, parsers=2, parse_processes=0, queue_size=8, validate=True, cache=None, track_changes=True):
+    """Pipelined counterpart of ``neo_ingest.ingest``: same tables, same stopping rule, overlapping stages."""
+    pipeline = Pipeline(start_date, end_date, target, db_path, chunk_size, fetchers, parsers,
+                        parse_processes, queue_size, validate, cache, track_changes=track_changes)
+    written, wall = pipeline.run()
+    print(f"\nCollected {written} asteroids (target was {target}) in {wall:.2f}s "
+          f"({written / wall if wall else 0:,.0f} rows/s).")
+    for report in pipeline.validator.reports if validate else []:
+        print(neo_validate.format_report(report))
+    if pipeline.changes is not None:
+        print(neo_changes.format_sync(pipeline.changes))
+    print(pipeline.report())
+    neo_snapshot.build_snapshot(db_path)
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import neo_cache
+
+    parser = argparse.ArgumentParser(description="Pipelined NeoWs ingest: concurrent fetch, parse and write stages")
+    parser.add_argument("--start-date", default="2024-01-01")
+    parser.add_argument("--end-date", default="2024-01-07")
+    parser.add_argument("--target", type=int, default=10000)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--fetchers", type=int, default=4)
+    parser.add_argument("--parsers", type=int, default=2)
+    parser.add_argument("--parse-processes", type=int, default=0,
+                        help="decode JSON in a process pool of this size (0 = in the parser threads)")
+    parser.add_argument("--queue-size", type=int, default=8)
+    parser.add_argument("--cache", help="serve/save pages through a neo_cache response store at this path")
+    parser.add_argument("--no-validate", action="store_true", help="skip the validation/quarantine stage")
+    parser.add_argument("--no-changes", action="store_true", help="plain append, without the change log")
+    args = parser.parse_args()
+
+    ingest(args.start_date, args.end_date, args.target, args.db, args.chunk_size, args.fetchers, args.parsers,
+           args.parse_processes, args.queue_size, not args.no_validate,
+           neo_cache.ResponseCache(args.cache) if args.cache else None, not args.no_changes)
+    print(f"Peak RSS: {neo_ingest.peak_rss_mb():.1f} MB")
@@ -0,0 +1,172 @@
+# Query catalog shared by the dashboards and the pipeline scripts
+# (same 20 queries as the notebook's "Step 5 : SQL Queries")
+queries = {
+    "1. Count asteroid approaches": '''
+        SELECT neo_reference_id, COUNT(*) AS approach_count
+        FROM close_approach
+        GROUP BY neo_reference_id
+        ORDER BY approach_count DESC
+    ''',
+    "2. Average velocity per asteroid": '''
+        SELECT neo_reference_id, AVG(relative_velocity_kmph) AS avg_velocity
+        FROM close_approach
+        GROUP BY neo_reference_id
+        ORDER BY avg_velocity DESC
+    ''',
+    "3. Top 10 fastest asteroids": '''
+        SELECT neo_reference_id, MAX(relative_velocity_kmph) AS max_velocity
+        FROM close_approach
+        GROUP BY neo_reference_id
+        ORDER BY max_velocity DESC
+        LIMIT 10
+    ''',
+    "4. Hazardous asteroids > 3 approaches": '''
+        SELECT ca.neo_reference_id, COUNT(*) AS approach_count
+        FROM close_approach ca
+        JOIN asteroids a ON ca.neo_reference_id = a.id
+        WHERE a.is_potentially_hazardous_asteroid = 1
+        GROUP BY ca.neo_reference_id
+        HAVING COUNT(*) > 3
+    ''',
+    "5. Month with most approaches": '''
+        SELECT strftime('%Y-%m', close_approach_date) AS month, COUNT(*) AS count
+        FROM close_approach
+        GROUP BY month
+        ORDER BY count DESC
+        LIMIT 1
+    ''',
+    "6. Fastest ever approach": '''
+        SELECT neo_reference_id, MAX(relative_velocity_kmph) AS fastest_speed
+        FROM close_approach
+        ORDER BY fastest_speed DESC
+        LIMIT 1
+    ''',
+    "7. Sort by max estimated diameter": '''
+        SELECT id, name, estimated_diameter_max_km
+        FROM asteroids
+        ORDER BY estimated_diameter_max_km DESC
+    ''',
+    "8. Closest approach getting nearer over time": '''
+        SELECT *
+        FROM close_approach
+        ORDER BY neo_reference_id, close_approach_date
+    ''',
+    "9. Closest approach date & distance": '''
+        SELECT a.name, ca.close_approach_date, MIN(ca.miss_distance_km) AS closest_approach
+        FROM close_approach ca
+        JOIN asteroids a ON ca.neo_reference_id = a.id
+        GROUP BY a.id
+        ORDER BY closest_approach ASC
+    ''',
+    "10. Velocity > 50,000 km/h": '''
+        SELECT DISTINCT a.name, ca.relative_velocity_kmph
+        FROM close_approach ca
+        JOIN asteroids a ON ca.neo_reference_id = a.id
+        WHERE ca.relative_velocity_kmph > 50000
+    ''',
+    "11. Approaches per month": '''
+        SELECT strftime('%Y-%m', close_approach_date) AS month, COUNT(*) AS total
+        FROM close_approach
+        GROUP BY month
+        ORDER BY total DESC
+    ''',
+    "12. Brightest asteroid (lowest magnitude)": '''
+        SELECT id, name, absolute_magnitude_h
+        FROM asteroids
+        ORDER BY absolute_magnitude_h ASC
+        LIMIT 1
+    ''',
+    "13. Hazardous vs Non-hazardous count": '''
+        SELECT is_potentially_hazardous_asteroid, COUNT(*) AS count
+        FROM asteroids
+        GROUP BY is_potentially_hazardous_asteroid
+    ''',
+    "14. Asteroids < 1 LD": '''
+        SELECT a.name, ca.close_approach_date, ca.miss_distance_lunar
+        FROM close_approach ca
+        JOIN asteroids a ON ca.neo_reference_id = a.id
+        WHERE ca.miss_distance_lunar < 1
+        ORDER BY ca.miss_distance_lunar
+    ''',
+    "15. Asteroids < 0.05 AU": '''
+        SELECT a.name, ca.close_approach_date, ca.astronomical
+        FROM close_approach ca
+        JOIN asteroids a ON ca.neo_reference_id = a.id
+        WHERE ca.astronomical < 0.05
+        ORDER BY ca.astronomical
+    ''',
+    "Bonus 1: Orbiting bodies (non-Earth)": '''
+        SELECT orbiting_body, COUNT(*) AS count
+        FROM close_approach
+        WHERE orbiting_body != 'Earth'
+        GROUP BY orbiting_body
+        ORDER BY count DESC
+    ''',
+    "Bonus 2: Avg miss distance by hazard type": '''
+        SELECT a.is_potentially_hazardous_asteroid, AVG(ca.miss_distance_km) AS avg_miss_distance
+        FROM close_approach ca
+        JOIN asteroids a ON ca.neo_reference_id = a.id
+        GROUP BY a.is_potentially_hazardous_asteroid
+    ''',
+    "Bonus 3: Top 5 closest approaches": '''
+        SELECT a.name, ca.close_approach_date, ca.miss_distance_km
+        FROM close_approach ca
+        JOIN asteroids a ON ca.neo_reference_id = a.id
+        ORDER BY ca.miss_distance_km ASC
+        LIMIT 5
+    ''',
+    "Bonus 4: Count of hazardous asteroids": '''
+        SELECT COUNT(DISTINCT id) AS hazardous_asteroid_count
+        FROM asteroids
+        WHERE is_potentially_hazardous_asteroid = 1
+    ''',
+    "Bonus 5: Frequent <1 LD asteroids": '''
+        SELECT ca.neo_reference_id, a.name, COUNT(*) AS close_pass_count
+        FROM close_approach ca
+        JOIN asteroids a ON ca.neo_reference_id = a.id
+        WHERE ca.miss_distance_lunar < 1
+        GROUP BY ca.neo_reference_id
+        HAVING COUNT(*) > 1
+        ORDER BY close_pass_count DESC
+    '''
+}
+
+
+def filter_query(selected_date, min_au, max_au, min_ld, max_ld, min_velocity, max_velocity,
+                 min_diameter, max_diameter, hazardous="Both"):
+    """Build the "Advanced Asteroid Approach Filters" query used by Improvised_nasa_project.py.
+
+    SQLite tests the WHERE terms in order: the range checks come before the
+    date parse, which costs more per row (the compact layout decodes the date too).
+    """
+    query = f'''
+SELECT a.name, ca.close_approach_date, ca.relative_velocity_kmph, ca.miss_distance_km, ca.miss_distance_lunar,
+       a.estimated_diameter_min_km, a.estimated_diameter_max_km, a.is_potentially_hazardous_asteroid
+FROM close_approach ca
+JOIN asteroids a ON ca.neo_reference_id = a.id
+WHERE ca.miss_distance_km BETWEEN {min_au} AND {max_au}  
+  AND ca.miss_distance_lunar BETWEEN {min_ld} AND {max_ld}
+  AND ca.relative_velocity_kmph BETWEEN {min_velocity} AND {max_velocity}
+  AND a.estimated_diameter_max_km BETWEEN {min_diameter} AND {max_diameter}
+  AND date(ca.close_approach_date) >= date('{selected_date}')
+'''
+    if hazardous == "Yes":
+        query += " AND a.is_potentially_hazardous_asteroid = 1"
+    elif hazardous == "No":
+        query += " AND a.is_potentially_hazardous_asteroid = 0"
+    return query
+
+
+def forecast_query(max_ld, until_date, hazardous_only=False):
+    """Upcoming close approaches predicted by neo_orbits.py (forecast_approach table)."""
+    query = f'''
+SELECT a.name, f.approach_date, f.miss_distance_lunar, f.miss_distance_au, f.relative_velocity_kmph,
+       a.is_potentially_hazardous_asteroid
+FROM forecast_approach f
+JOIN (SELECT DISTINCT id, name, is_potentially_hazardous_asteroid FROM asteroids) a ON a.id = f.id
+WHERE f.miss_distance_lunar <= {max_ld}
+  AND f.approach_date <= '{until_date}'
+'''
+    if hazardous_only:
+        query += " AND a.is_potentially_hazardous_asteroid = 1"
+    return query + " ORDER BY f.approach_date"
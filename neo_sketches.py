@@ -0,0 +1,313 @@
+import json
+import math
+import base64
+import random
+import sqlite3
+import hashlib
+from datetime import datetime, timezone
+
+import neo_snapshot
+
+DB_PATH = "Asteroid_Data.db"
+
+CREATE_SKETCHES = '''
+CREATE TABLE IF NOT EXISTS sketches (
+    name TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    updated_at TEXT
+)
+'''
+
+
+class HyperLogLog:
+    """Distinct counter with 2**p registers; standard error ~1.04 / sqrt(2**p)."""
+
+    def __init__(self, p=14, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, value):
+        h = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Small-range correction (linear counting)
+            estimate = self.m * math.log(self.m / zeros)
+        return estimate
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def to_dict(self):
+        return {"p": self.p, "registers": base64.b64encode(bytes(self.registers)).decode()}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["p"], base64.b64decode(d["registers"]))
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (KLL); normalized rank error ~2.446 / k**0.9433 (~1.65% at k=200)."""
+
+    def __init__(self, k=200, levels=None, n=0, seed=None):
+        self.k = k
+        self.levels = levels if levels is not None else [[]]
+        self.n = n
+        self._random = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def add(self, value):
+        if value is None or value != value:
+            return
+        self.levels[0].append(value)
+        self.n += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def _compress(self):
+        for level in range(len(self.levels)):
+            items = self.levels[level]
+            if len(items) >= self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append([])
+                # Keep every other item (random offset); each survivor doubles its weight
+                items.sort()
+                offset = self._random.randint(0, 1)
+                self.levels[level + 1].extend(items[offset::2])
+                self.levels[level] = []
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        self._compress()
+
+    def quantile(self, q):
+        weighted = sorted((v, 1 << level) for level, items in enumerate(self.levels) for v in items)
+        if not weighted:
+            return None
+        total = sum(w for _, w in weighted)
+        target = q * total
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return weighted[-1][0]
+
+    def sample_size(self):
+        return sum(len(items) for items in self.levels)
+
+    def rank_error(self):
+        # DataSketches' empirical fit at 99% confidence for all ranks at once (the dashboard
+        # shows a whole percentile table; the single-rank fit, 2.296 / k**0.9723, is ~1.3%)
+        return 2.446 / self.k ** 0.9433
+
+    def to_dict(self):
+        return {"k": self.k, "n": self.n, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["k"], d["levels"], d["n"])
+
+
+class Reservoir:
+    """Uniform random sample of fixed size (Algorithm R) for distribution charts."""
+
+    def __init__(self, size=2000, items=None, n=0, seed=None):
+        self.size = size
+        self.items = items if items is not None else []
+        self.n = n
+        self._random = random.Random(seed)
+
+    def add(self, value):
+        if value is None or value != value:
+            return
+        self.n += 1
+        if len(self.items) < self.size:
+            self.items.append(value)
+        else:
+            j = self._random.randrange(self.n)
+            if j < self.size:
+                self.items[j] = value
+
+    def to_dict(self):
+        return {"size": self.size, "n": self.n, "items": self.items}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["size"], d["items"], d["n"])
+
+
+class SketchSet:
+    """All sketches behind the dashboard's approximate mode, updated per ingest chunk.
+
+    Counts that are cheap to keep exactly (approach rows, hazardous rows,
+    velocity sum/max) are plain counters; only distinct counts, percentiles
+    and distributions are approximate.
+    """
+
+    KINDS = {"hll": HyperLogLog, "kll": KLLSketch, "reservoir": Reservoir}
+
+    def __init__(self):
+        self.asteroid_ids = HyperLogLog()
+        self.hazardous_ids = HyperLogLog()
+        self.velocity = KLLSketch()
+        self.miss_distance_km = KLLSketch()
+        self.miss_distance_lunar = KLLSketch()
+        self.velocity_sample = Reservoir()
+        self.miss_distance_lunar_sample = Reservoir()
+        self.counters = {"asteroid_rows": 0, "approaches": 0, "hazardous_rows": 0,
+                         "velocity_sum": 0.0, "velocity_count": 0, "velocity_max": None}
+
+    def add_asteroid(self, id_, hazardous):
+        c = self.counters
+        self.asteroid_ids.add(id_)
+        c["asteroid_rows"] += 1
+        if hazardous:
+            self.hazardous_ids.add(id_)
+            c["hazardous_rows"] += 1
+
+    def add_approach(self, velocity, miss_distance_km, miss_distance_lunar):
+        c = self.counters
+        c["approaches"] += 1
+        if velocity is not None and velocity == velocity:
+            c["velocity_sum"] += velocity
+            c["velocity_count"] += 1
+            c["velocity_max"] = velocity if c["velocity_max"] is None else max(c["velocity_max"], velocity)
+        self.velocity.add(velocity)
+        self.velocity_sample.add(velocity)
+        self.miss_distance_km.add(miss_distance_km)
+        self.miss_distance_lunar.add(miss_distance_lunar)
+        self.miss_distance_lunar_sample.add(miss_distance_lunar)
+
+    def update(self, buffer, rows=None):
+        """Fold the rows of a ``neo_ingest.RecordBuffer`` (or just the indices in ``rows``) into the sketches."""
+        for i in range(len(buffer)) if rows is None else rows:
+            self.add_asteroid(buffer.ids[i], buffer.is_hazardous[i])
+            self.add_approach(buffer.relative_velocity_kmph[i], buffer.miss_distance_km[i],
+                              buffer.miss_distance_lunar[i])
+
+    def _sketches(self):
+        return {name: value for name, value in vars(self).items() if name != "counters"}
+
+    def save(self, conn):
+        conn.execute(CREATE_SKETCHES)
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [("counters", json.dumps(self.counters), now)]
+        for name, sketch in self._sketches().items():
+            kind = next(k for k, cls in self.KINDS.items() if isinstance(sketch, cls))
+            rows.append((name, json.dumps({"kind": kind, **sketch.to_dict()}), now))
+        conn.executemany("INSERT OR REPLACE INTO sketches VALUES (?,?,?)", rows)
+
+    @classmethod
+    def load(cls, conn):
+        """Load the stored sketches, or None if they were never built for this database."""
+        try:
+            rows = conn.execute("SELECT name, payload FROM sketches").fetchall()
+        except sqlite3.OperationalError:
+            return None
+        if not rows:
+            return None
+        sketches = cls()
+        for name, payload in rows:
+            d = json.loads(payload)
+            if name == "counters":
+                sketches.counters.update(d)
+            elif hasattr(sketches, name):
+                setattr(sketches, name, cls.KINDS[d.pop("kind")].from_dict(d))
+        return sketches
+
+    def overview(self):
+        """Top-of-page metrics as (value, relative error or None if exact)."""
+        c = self.counters
+        hll_error = self.asteroid_ids.relative_error()
+        return {
+            "total_asteroids": (self.asteroid_ids.count(), hll_error),
+            "total_approaches": (c["approaches"], None),
+            "hazardous_count": (c["hazardous_rows"], None),
+            "distinct_hazardous": (self.hazardous_ids.count(), hll_error),
+            "avg_velocity": (c["velocity_sum"] / c["velocity_count"] if c["velocity_count"] else None, None),
+            "max_velocity": (c["velocity_max"], None),
+        }
+
+    def percentiles(self, qs=(0.5, 0.9, 0.99)):
+        """Percentiles of velocity and miss distance from the KLL sketches."""
+        result = {}
+        for label, sketch in (("relative_velocity_kmph", self.velocity),
+                              ("miss_distance_km", self.miss_distance_km),
+                              ("miss_distance_lunar", self.miss_distance_lunar)):
+            result[label] = {f"p{round(q * 100)}": sketch.quantile(q) for q in qs}
+            result[label]["rank_error"] = sketch.rank_error()
+        return result
+
+
+def build_from_tables(conn):
+    """Compute a SketchSet from the rows already in ``asteroids`` and ``close_approach``."""
+    sketches = SketchSet()
+    for id_, hazardous in conn.execute(
+            "SELECT id, is_potentially_hazardous_asteroid FROM asteroids"):
+        sketches.add_asteroid(id_, hazardous)
+    for velocity, miss_km, miss_lunar in conn.execute(
+            "SELECT relative_velocity_kmph, miss_distance_km, miss_distance_lunar FROM close_approach"):
+        sketches.add_approach(velocity, miss_km, miss_lunar)
+    return sketches
+
+
+def load_or_build(conn):
+    """Stored sketches for ``conn``, bootstrapping them from the tables on first use."""
+    sketches = SketchSet.load(conn)
+    if sketches is None:
+        sketches = build_from_tables(conn)
+    return sketches
+
+
+def rebuild(db_path=DB_PATH):
+    """Recompute and store all sketches (e.g. for a database loaded before sketches existed)."""
+    conn = sqlite3.connect(db_path)
+    sketches = build_from_tables(conn)
+    with conn:
+        sketches.save(conn)
+    conn.close()
+    neo_snapshot.refresh_snapshot(db_path)
+    return sketches
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build and inspect the approximate-mode sketches")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--rebuild", action="store_true", help="recompute sketches from the tables")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        sketches = rebuild(args.db)
+    else:
+        conn = sqlite3.connect(args.db)
+        sketches = SketchSet.load(conn)
+        conn.close()
+        if sketches is None:
+            parser.error("no sketches stored yet, run with --rebuild")
+    for name, (value, error) in sketches.overview().items():
+        bound = f" ±{error:.1%}" if error else ""
+        print(f"{name:>20}: {value:,.1f}{bound}" if value is not None else f"{name:>20}: -")
+    for column, values in sketches.percentiles().items():
+        print(column, values)
@@ -0,0 +1,147 @@
+import os
+import gzip
+import json
+import time
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from neo_queries import queries
+
+DB_PATH = "Asteroid_Data.db"
+
+# Small, fixed-result queries whose answers only change when the data is re-ingested
+SNAPSHOT_QUERIES = [
+    "5. Month with most approaches",
+    "6. Fastest ever approach",
+    "12. Brightest asteroid (lowest magnitude)",
+    "13. Hazardous vs Non-hazardous count",
+    "Bonus 1: Orbiting bodies (non-Earth)",
+    "Bonus 2: Avg miss distance by hazard type",
+    "Bonus 3: Top 5 closest approaches",
+    "Bonus 4: Count of hazardous asteroids",
+]
+
+OVERVIEW_QUERIES = {
+    "total_asteroids": "SELECT COUNT(DISTINCT id) FROM asteroids",
+    "total_approaches": "SELECT COUNT(*) FROM close_approach",
+    "hazardous_count": "SELECT COUNT(*) FROM asteroids WHERE is_potentially_hazardous_asteroid = 1",
+}
+
+
+def db_signature(db_path):
+    """(size, mtime_ns) of the database file; a snapshot is only valid for the same signature."""
+    stat = os.stat(db_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def snapshot_path_for(db_path):
+    """Snapshot file kept next to the database it describes, named after it."""
+    return os.path.splitext(db_path)[0] + ".snapshot.json.gz"
+
+
+def chart_payload(columns, rows):
+    """Bar chart data for two-column count results (same rule as show_query's charts), else None."""
+    if len(columns) == 2 and columns[1] in ('count', 'approach_count', 'total'):
+        top = rows[:10]
+        return {"x": [r[0] for r in top], "y": [r[1] for r in top],
+                "x_label": columns[0], "y_label": columns[1],
+                "title": f"Top 10 - {columns[1].replace('_', ' ').title()}"}
+    return None
+
+
+def build_snapshot(db_path=DB_PATH, out_path=None):
+    """Write overview metrics, fixed query results and chart payloads for ``db_path`` to ``out_path``."""
+    out_path = out_path or snapshot_path_for(db_path)
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        overview = {name: conn.execute(sql).fetchone()[0] for name, sql in OVERVIEW_QUERIES.items()}
+        results = {}
+        for name in SNAPSHOT_QUERIES:
+            cursor = conn.execute(queries[name])
+            columns = [c[0] for c in cursor.description]
+            rows = [list(r) for r in cursor.fetchall()]
+            results[name] = {"columns": columns, "rows": rows, "chart": chart_payload(columns, rows)}
+    finally:
+        conn.close()
+
+    snapshot = {
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "db_signature": db_signature(db_path),
+        "overview": overview,
+        "queries": results,
+    }
+    tmp = out_path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+    os.replace(tmp, out_path)
+    print(f"Wrote {out_path} ({os.path.getsize(out_path):,} bytes) in {time.perf_counter() - started:.3f}s")
+    return snapshot
+
+
+def refresh_snapshot(db_path=DB_PATH):
+    """Rebuild an existing snapshot after a write to ``db_path``.
+
+    Any write changes the file signature, so writers that do not go through
+    ingest (enrichment, forecasts, change-log acknowledgements) call this to
+    keep the dashboard on its snapshot.
+    """
+    if os.path.exists(snapshot_path_for(db_path)):
+        return build_snapshot(db_path)
+    return None
+
+
+def load_snapshot(db_path=DB_PATH, path=None):
+    """Return the snapshot if it exists and matches the current database file, else None."""
+    try:
+        with gzip.open(path or snapshot_path_for(db_path), "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if snapshot.get("db_signature") != db_signature(db_path):
+            return None
+        return snapshot
+    except (OSError, ValueError):
+        return None
+
+
+def measure_first_render(app="Improvised_nasa_project.py", runs=3):
+    """Time-to-first-render of ``app`` in fresh interpreters, with and without the snapshot.
+
+    Each run starts a new Python process (cold imports) that executes the
+    script with Streamlit's AppTest and reports the ``first_render_ms`` the
+    app records once the overview metrics are on the page.
+    """
+    probe = (
+        "import time; t = time.perf_counter();"
+        "from streamlit.testing.v1 import AppTest;"
+        f"at = AppTest.from_file({app!r}, default_timeout=120); at.run();"
+        "print(at.session_state['first_render_ms'], (time.perf_counter() - t) * 1000)"
+    )
+    results = {}
+    for label, env_value in (("snapshot", "1"), ("no snapshot", "0")):
+        env = dict(os.environ, NEO_USE_SNAPSHOT=env_value)
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, env=env, check=True)
+            first, total = map(float, out.stdout.split()[-2:])
+            samples.append((first, total))
+        results[label] = samples
+        first = sorted(s[0] for s in samples)[len(samples) // 2]
+        total = sorted(s[1] for s in samples)[len(samples) // 2]
+        print(f"{label:>12}: first render {first:8.1f} ms   full script {total:8.1f} ms  (median of {runs})")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the dashboard's startup snapshot")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--output", "-o", help="defaults to <db>.snapshot.json.gz next to the database")
+    parser.add_argument("--measure", action="store_true", help="report time-to-first-render with and without the snapshot")
+    args = parser.parse_args()
+
+    build_snapshot(args.db, args.output)
+    if args.measure:
+        measure_first_render()
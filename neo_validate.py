@@ -0,0 +1,244 @@
+import json
+import time
+import sqlite3
+from datetime import datetime, timezone
+
+import numpy as np
+
+DB_PATH = "Asteroid_Data.db"
+
+AU_KM = 149597870.7
+# NeoWs converts miss distances with this lunar distance (not the 384,400 km mean)
+NEOWS_LD_KM = 384570.35989717
+# Relative tolerance for the km / AU / LD cross-check (the feed rounds to ~10 significant digits)
+UNIT_TOLERANCE = 1e-4
+
+# Hard limits; anything outside is physically implausible for a NeoWs record
+RANGES = {
+    "absolute_magnitude_h": (0.0, 40.0),
+    "estimated_diameter_min_km": (0.0, 100.0),
+    "estimated_diameter_max_km": (0.0, 100.0),
+    "relative_velocity_kmph": (0.0, 500000.0),
+    "astronomical": (0.0, 10.0),
+    "miss_distance_km": (0.0, 10.0 * AU_KM),
+    "miss_distance_lunar": (0.0, 10.0 * AU_KM / NEOWS_LD_KM),
+}
+
+# RecordBuffer float columns checked column-wise (NaN marks a missing value)
+NUMERIC_COLUMNS = tuple(RANGES)
+
+CREATE_QUARANTINE = '''
+CREATE TABLE IF NOT EXISTS quarantine (
+    batch_id INTEGER,
+    id INTEGER,
+    neo_reference_id INTEGER,
+    name TEXT,
+    absolute_magnitude_h REAL,
+    estimated_diameter_min_km REAL,
+    estimated_diameter_max_km REAL,
+    is_potentially_hazardous_asteroid BOOLEAN,
+    close_approach_date TEXT,
+    relative_velocity_kmph REAL,
+    astronomical REAL,
+    miss_distance_km REAL,
+    miss_distance_lunar REAL,
+    orbiting_body TEXT,
+    reasons TEXT,
+    quarantined_at TEXT
+)
+'''
+
+CREATE_QUALITY_REPORT = '''
+CREATE TABLE IF NOT EXISTS quality_report (
+    batch_id INTEGER PRIMARY KEY,
+    created_at TEXT,
+    rows INTEGER,
+    passed INTEGER,
+    quarantined INTEGER,
+    null_rates TEXT,
+    failures TEXT,
+    elapsed_ms REAL
+)
+'''
+
+
+def _day_numbers(dates):
+    # None -> NaT -> the minimum int64, which never matches a real date
+    return np.array([d or "NaT" for d in dates], dtype="datetime64[D]").astype(np.int64)
+
+
+class Validator:
+    """Column-wise checks over each ``neo_ingest.RecordBuffer`` before it is written.
+
+    ``check`` returns a boolean keep-mask and a quality report. Rows failing
+    any check are quarantined (with their reasons) by ``quarantine`` and left
+    out of ``asteroids``/``close_approach``. Duplicate (id, date) keys are
+    detected within the batch, across batches of this run, and (unless
+    ``check_existing`` is False) against rows already in the database.
+    """
+
+    def __init__(self, conn=None, check_existing=True):
+        # Accepted (id, date) keys as a few sorted runs, so each batch only sorts its own keys
+        self.seen = []
+        # A change-tracked sync updates existing keys instead, so only in-run duplicates count
+        if conn is not None and check_existing:
+            try:
+                existing = conn.execute('''
+                    SELECT neo_reference_id, CAST(julianday(close_approach_date) - 2440587.5 AS INTEGER)
+                    FROM close_approach WHERE close_approach_date IS NOT NULL
+                ''').fetchall()
+            except sqlite3.OperationalError:
+                existing = []
+            if existing:
+                pairs = np.array(existing, dtype=np.int64)
+                self.seen.append(np.unique(self._keys(pairs[:, 0], pairs[:, 1])))
+        self.batch_id = self._next_batch_id(conn)
+        self.reports = []
+
+    @staticmethod
+    def _next_batch_id(conn):
+        if conn is None:
+            return 1
+        try:
+            return (conn.execute("SELECT MAX(batch_id) FROM quality_report").fetchone()[0] or 0) + 1
+        except sqlite3.OperationalError:
+            return 1
+
+    def _already_seen(self, keys):
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self.seen:
+            idx = np.minimum(np.searchsorted(run, keys), len(run) - 1)
+            found |= run[idx] == keys
+        return found
+
+    def _remember(self, keys):
+        self.seen.append(np.unique(keys))
+        if len(self.seen) > 16:
+            self.seen = [np.unique(np.concatenate(self.seen))]
+
+    @staticmethod
+    def _keys(ids, days):
+        return ids.astype(np.int64) * 1_000_000 + days.astype(np.int64)
+
+    def check(self, buffer):
+        """Return (keep mask, failures per row as list of reason lists, report dict)."""
+        started = time.perf_counter()
+        n = len(buffer)
+        cols = {attr: np.frombuffer(getattr(buffer, attr), dtype=np.float64) if n else np.empty(0)
+                for attr in NUMERIC_COLUMNS}
+        dates = _day_numbers(buffer.close_approach_dates)
+        ids = np.frombuffer(buffer.neo_reference_ids, dtype=np.int64) if n else np.empty(0, dtype=np.int64)
+
+        checks = {}
+        null_rates = {name: float(np.isnan(values).mean()) if n else 0.0 for name, values in cols.items()}
+        missing_date = dates == np.iinfo(np.int64).min
+        null_rates["close_approach_date"] = float(missing_date.mean()) if n else 0.0
+        missing_body = np.array([b is None for b in buffer.orbiting_bodies], dtype=bool)
+        null_rates["orbiting_body"] = float(missing_body.mean()) if n else 0.0
+
+        checks["missing_approach"] = missing_date | np.isnan(cols["miss_distance_km"])
+        with np.errstate(invalid="ignore"):
+            for name, (low, high) in RANGES.items():
+                values = cols[name]
+                checks[f"range:{name}"] = ~np.isnan(values) & ((values < low) | (values > high))
+            checks["diameter_min_gt_max"] = cols["estimated_diameter_min_km"] > cols["estimated_diameter_max_km"]
+            km = cols["miss_distance_km"]
+            checks["units:km_vs_au"] = np.abs(km - cols["astronomical"] * AU_KM) > UNIT_TOLERANCE * km
+            checks["units:km_vs_lunar"] = np.abs(km - cols["miss_distance_lunar"] * NEOWS_LD_KM) > UNIT_TOLERANCE * km
+
+        keys = self._keys(ids, np.where(missing_date, 0, dates))
+        duplicate = np.zeros(n, dtype=bool)
+        if n:
+            _, first = np.unique(keys, return_index=True)
+            duplicate[:] = True
+            duplicate[first] = False
+            duplicate |= self._already_seen(keys)
+        duplicate &= ~missing_date
+        checks["duplicate_id_date"] = duplicate
+
+        bad = np.zeros(n, dtype=bool)
+        for mask in checks.values():
+            bad |= mask
+        keep = ~bad
+        # Only accepted rows count as "seen" for later batches
+        self._remember(keys[keep & ~missing_date])
+
+        reasons = [[] for _ in range(n)]
+        for name, mask in checks.items():
+            for i in np.flatnonzero(mask):
+                reasons[i].append(name)
+
+        report = {
+            "batch_id": self.batch_id,
+            "rows": n,
+            "passed": int(keep.sum()),
+            "quarantined": int(bad.sum()),
+            "null_rates": null_rates,
+            "failures": {name: int(mask.sum()) for name, mask in checks.items() if mask.any()},
+            "elapsed_ms": (time.perf_counter() - started) * 1000,
+        }
+        return keep, reasons, report
+
+    def quarantine(self, conn, buffer, keep, reasons, report):
+        """Write rejected rows and the batch report (call inside the flush transaction)."""
+        conn.execute(CREATE_QUARANTINE)
+        conn.execute(CREATE_QUALITY_REPORT)
+        now = datetime.now(timezone.utc).isoformat()
+        rejected = np.flatnonzero(~keep).tolist()
+        if rejected:
+            conn.executemany(
+                "INSERT INTO quarantine VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                ((self.batch_id,) + buffer.record(i) + (",".join(reasons[i]), now) for i in rejected))
+        conn.execute("INSERT INTO quality_report VALUES (?,?,?,?,?,?,?,?)", (
+            self.batch_id, now, report["rows"], report["passed"], report["quarantined"],
+            json.dumps(report["null_rates"]), json.dumps(report["failures"]), report["elapsed_ms"]))
+        self.reports.append(report)
+        self.batch_id += 1
+
+
+def format_report(report):
+    failures = ", ".join(f"{k}={v}" for k, v in report["failures"].items()) or "none"
+    return (f"batch {report['batch_id']}: {report['rows']:,} rows, {report['passed']:,} passed, "
+            f"{report['quarantined']:,} quarantined ({failures}) in {report['elapsed_ms']:.1f} ms")
+
+
+def benchmark(n=1000000, chunk_size=50000):
+    """Validation throughput on synthetic rows, to compare against the loader's own rate."""
+    import neo_ingest
+
+    validator = Validator()
+    buffer = neo_ingest.RecordBuffer()
+    elapsed = 0.0
+    for record in neo_ingest._synthetic_records(n):
+        buffer.append(record)
+        if len(buffer) >= chunk_size:
+            started = time.perf_counter()
+            validator.check(buffer)
+            elapsed += time.perf_counter() - started
+            buffer.clear()
+    print(f"Validated {n:,} rows in {elapsed:.2f}s ({n / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect ingest quality reports or benchmark validation")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--benchmark", type=int, metavar="ROWS")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    else:
+        conn = sqlite3.connect(args.db)
+        try:
+            rows = conn.execute("SELECT batch_id, rows, passed, quarantined, failures, elapsed_ms "
+                                "FROM quality_report ORDER BY batch_id").fetchall()
+        except sqlite3.OperationalError:
+            rows = []
+        for batch_id, n, passed, quarantined, failures, elapsed_ms in rows:
+            print(format_report({"batch_id": batch_id, "rows": n, "passed": passed, "quarantined": quarantined,
+                                 "failures": json.loads(failures), "elapsed_ms": elapsed_ms}))
+        if not rows:
+            print("No quality reports yet.")
+        conn.close()